@@ -0,0 +1,15 @@
+"""Gunicorn settings for the multi-worker API; loaded by `python -m app.serve`."""
+import os
+
+from prometheus_client import multiprocess
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+worker_class = "uvicorn_worker.UvicornWorker"
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+# no max_requests: recycled workers leave their counters behind as dead-process files
+
+
+def child_exit(server, worker):
+    # merge the dead worker's live gauges away; its counters/histograms keep being aggregated
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,30 @@
+from fastapi import Request, Response
+
+
+# matches in a terminal state never change again
+CACHE_IMMUTABLE = "public, max-age=3600"
+# cacheable but must be revalidated (cheaply, via If-None-Match) on every use
+CACHE_REVALIDATE = "no-cache"
+
+
+def make_etag(kind: str, version) -> str:
+    return f'"{kind}-{version}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # weak comparison, as RFC 9110 requires for If-None-Match
+    return any(t.strip().removeprefix("W/") == etag for t in header.split(","))
+
+
+def cache_headers(etag: str, cache_control: str) -> dict:
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag, cache_control))
+
@@ -0,0 +1,7 @@
+"""Explicit schema migration step: `python -m app.migrate` (run once per deploy, before the API)."""
+from .db import SCHEMA_VERSION, migrate
+
+
+if __name__ == "__main__":
+    version = migrate()
+    print(f"schema at v{version} (this build: v{SCHEMA_VERSION})")
@@ -0,0 +1,124 @@
+"""
+Opt-in recorder of queue traffic (QUEUE_TRACE_PATH), replayed by simulation/replay_trace.py.
+
+Records are fixed-layout binary:
+    <d ts> <B event> <B region> <f mu> <f sigma> <H id length> <id utf-8>
+where id is the player id (enqueue/dequeue) or the match id (result events).
+Request threads only pack a record and append it to an in-memory buffer; a daemon thread
+writes the buffer out every QUEUE_TRACE_FLUSH_S. If the writer falls behind, records are
+dropped (and counted) rather than slowing requests down.
+"""
+import atexit, math, os, struct, threading, time
+from typing import Iterator, NamedTuple, Optional
+
+from prometheus_client import Counter
+
+QUEUE_TRACE_PATH = os.getenv("QUEUE_TRACE_PATH")
+QUEUE_TRACE_FLUSH_S = float(os.getenv("QUEUE_TRACE_FLUSH_S", "0.5"))
+QUEUE_TRACE_MAX_BUFFERED = int(os.getenv("QUEUE_TRACE_MAX_BUFFERED", "200000"))
+
+MAGIC = b"QTR1"
+EVENT_ENQUEUE, EVENT_DEQUEUE, EVENT_RESULT_A, EVENT_RESULT_B = 0, 1, 2, 3
+REGIONS = ("EUW", "EUNE", "NA", "CHN", "JPN", "KR", "OCE", "BR", "LAS", "LAN")
+_REGION_CODES = {r: i for i, r in enumerate(REGIONS)}
+_UNKNOWN_REGION = 255
+
+_HEAD = struct.Struct("<dBBffH")
+
+TRACE_RECORDS = Counter("queue_trace_records_total", "Queue trace records", ["outcome"])
+
+
+class TraceEvent(NamedTuple):
+    ts: float
+    event: int
+    region: Optional[str]
+    mu: float
+    sigma: float
+    id: str
+
+
+def encode(ts: float, event: int, region: Optional[str], mu: float, sigma: float, id_: str) -> bytes:
+    raw = id_.encode()
+    return _HEAD.pack(ts, event, _REGION_CODES.get(region, _UNKNOWN_REGION), mu, sigma, len(raw)) + raw
+
+
+def read_trace(path: str) -> Iterator[TraceEvent]:
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a queue trace")
+        data = f.read()
+    pos = 0
+    while pos + _HEAD.size <= len(data):
+        ts, event, region, mu, sigma, n = _HEAD.unpack_from(data, pos)
+        pos += _HEAD.size
+        id_ = data[pos:pos + n].decode()
+        pos += n
+        yield TraceEvent(ts, event, REGIONS[region] if region < len(REGIONS) else None, mu, sigma, id_)
+
+
+class TraceRecorder:
+    def __init__(self, path: str, flush_s: float = QUEUE_TRACE_FLUSH_S,
+                 max_buffered: int = QUEUE_TRACE_MAX_BUFFERED):
+        self.path = path
+        self.flush_s = flush_s
+        self.max_buffered = max_buffered
+        self._buf: list[bytes] = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def record(self, event: int, region: Optional[str], mu: float, sigma: float, id_: str) -> None:
+        rec = encode(time.time(), event, region, mu, sigma, id_)
+        with self._lock:
+            if len(self._buf) >= self.max_buffered:
+                TRACE_RECORDS.labels(outcome="dropped").inc()
+                return
+            self._buf.append(rec)
+        TRACE_RECORDS.labels(outcome="buffered").inc()
+        if self._pid != os.getpid():
+            self._start()
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # one file per process: API workers must not interleave partial writes
+            self._pid = os.getpid()
+            self._file = f"{self.path}.{self._pid}"
+            with open(self._file, "ab") as f:
+                if f.tell() == 0:
+                    f.write(MAGIC)
+            self._thread = threading.Thread(target=self._run, name="queue-trace-writer", daemon=True)
+            self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.flush_s)
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            buf, self._buf = self._buf, []
+        if buf:
+            with open(self._file, "ab") as f:
+                f.write(b"".join(buf))
+
+
+recorder = TraceRecorder(QUEUE_TRACE_PATH) if QUEUE_TRACE_PATH else None
+
+
+def trace_enqueue(player_id: str, region: str, mu: float, sigma: float) -> None:
+    if recorder is not None:
+        recorder.record(EVENT_ENQUEUE, region, mu, sigma, player_id)
+
+
+def trace_dequeue(player_id: str, region: Optional[str]) -> None:
+    if recorder is not None:
+        recorder.record(EVENT_DEQUEUE, region, math.nan, math.nan, player_id)
+
+
+def trace_result(match_id: str, region: Optional[str], winner_team: str) -> None:
+    if recorder is not None:
+        event = EVENT_RESULT_A if winner_team == "teamA" else EVENT_RESULT_B
+        recorder.record(event, region, math.nan, math.nan, match_id)
@@ -0,0 +1,193 @@
+import asyncio, math, os, threading, time
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import Depends, Header, HTTPException
+from prometheus_client import Counter
+
+from . import db
+from .security import check_api_key
+
+
+# --- Config ---
+# rate <= 0 disables the corresponding bucket
+KEY_RPS = float(os.getenv("RATE_LIMIT_KEY_RPS", "500"))
+KEY_BURST = float(os.getenv("RATE_LIMIT_KEY_BURST", "1000"))
+PLAYER_RPS = float(os.getenv("RATE_LIMIT_PLAYER_RPS", "2"))
+PLAYER_BURST = float(os.getenv("RATE_LIMIT_PLAYER_BURST", "10"))
+MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "100000"))
+
+# "group=limit,..."; groups without a limit are not capped
+CONCURRENCY_LIMITS = os.getenv(
+    "CONCURRENCY_LIMITS",
+    "matchmaking_write=32,matchmaking_read=64,players_write=16,players_read=64",
+)
+ADMISSION_WAIT_S = float(os.getenv("ADMISSION_WAIT_S", "0.05"))
+SHED_POOL_WAIT_S = float(os.getenv("SHED_POOL_WAIT_S", "0.25"))
+# requests waiting for a concurrency slot, across all groups (0 disables)
+SHED_MAX_QUEUED = int(os.getenv("SHED_MAX_QUEUED", "64"))
+SHED_RETRY_AFTER_S = int(os.getenv("SHED_RETRY_AFTER_S", "1"))
+
+RATE_LIMITED = Counter(
+    "rate_limited_requests_total", "Requests rejected by a token bucket", ["scope"]
+)
+REQUESTS_SHED = Counter(
+    "shed_requests_total", "Requests rejected by admission control", ["group", "reason"]
+)
+
+
+# --- Token buckets ---
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "stamp")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = now
+
+    def take(self, now: float, n: float = 1.0) -> float:
+        """Take n tokens; returns 0.0 on success, else seconds until they are available."""
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= n:
+            self.tokens -= n
+            return 0.0
+        return (n - self.tokens) / self.rate
+
+
+class BucketRegistry:
+    """Token buckets keyed by caller, bounded in size (least recently used are evicted)."""
+
+    def __init__(self, rate: float, burst: float, max_keys: int = MAX_BUCKETS):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, now: Optional[float] = None) -> float:
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst, now)
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket.take(now)
+
+
+api_key_buckets = BucketRegistry(KEY_RPS, KEY_BURST)
+player_buckets = BucketRegistry(PLAYER_RPS, PLAYER_BURST)
+
+
+def _retry_after(seconds: float) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+
+def _enforce(registry: BucketRegistry, scope: str, key: str) -> None:
+    wait = registry.take(key)
+    if wait:
+        RATE_LIMITED.labels(scope=scope).inc()
+        raise HTTPException(status_code=429, detail="rate limit exceeded", headers=_retry_after(wait))
+
+
+# --- Dependencies ---
+async def limit_api_key(x_api_key: Optional[str] = Header(None), _: None = Depends(check_api_key)):
+    # check_api_key runs first, so rejected keys never allocate a bucket
+    _enforce(api_key_buckets, "api_key", x_api_key)
+
+
+def limit_player(player_id: str) -> None:
+    """Per-player bucket for routes that take the player id from the path or body."""
+    _enforce(player_buckets, "player", player_id)
+
+
+# --- Admission control ---
+def _parse_limits(spec: str) -> dict[str, int]:
+    out = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        group, _, limit = part.partition("=")
+        out[group.strip()] = int(limit)
+    return out
+
+
+def route_group(method: str, path: str) -> Optional[str]:
+    if path.startswith("/matchmaking"):
+        return "matchmaking_read" if method == "GET" else "matchmaking_write"
+    if path.startswith("/players"):
+        return "players_read" if method == "GET" else "players_write"
+    # health, metrics and docs are never limited
+    return None
+
+
+class AdmissionMiddleware:
+    """
+    Caps concurrent requests per route group and sheds load (503 + Retry-After)
+    while the DB pool is contended or too many requests are queued for a slot.
+    Plain ASGI so that the rejection path does not pay for a request object.
+    """
+
+    def __init__(self, app, limits: Optional[dict[str, int]] = None, max_queued: int = SHED_MAX_QUEUED):
+        self.app = app
+        limits = _parse_limits(CONCURRENCY_LIMITS) if limits is None else limits
+        self.semaphores = {g: asyncio.Semaphore(n) for g, n in limits.items() if n > 0}
+        self.max_queued = max_queued
+        # requests parked on a full semaphore; holders of a slot are bounded by the limits already
+        self.waiting = 0
+
+    def _shed_reason(self) -> Optional[str]:
+        if self.max_queued > 0 and self.waiting >= self.max_queued:
+            return "queue_depth"
+        if SHED_POOL_WAIT_S > 0 and db.pool_wait.current() > SHED_POOL_WAIT_S:
+            return "pool_wait"
+        return None
+
+    async def _reject(self, send, group: str, reason: str):
+        REQUESTS_SHED.labels(group=group, reason=reason).inc()
+        body = b'{"detail":"server overloaded, retry later"}'
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(SHED_RETRY_AFTER_S).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        group = route_group(scope["method"], scope["path"])
+        if group is None:
+            return await self.app(scope, receive, send)
+
+        reason = self._shed_reason()
+        if reason:
+            return await self._reject(send, group, reason)
+
+        sem = self.semaphores.get(group)
+        if sem is not None:
+            if not sem.locked():
+                await sem.acquire()
+            else:
+                # short bounded wait for a slot, then reject instead of piling up on the pool
+                self.waiting += 1
+                try:
+                    await asyncio.wait_for(sem.acquire(), timeout=ADMISSION_WAIT_S)
+                except asyncio.TimeoutError:
+                    return await self._reject(send, group, "concurrency")
+                finally:
+                    self.waiting -= 1
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if sem is not None:
+                sem.release()
@@ -0,0 +1,7 @@
+from fastapi.responses import Response
+
+
+class RawJSONResponse(Response):
+    """Body that is already JSON text, e.g. rendered by Postgres; sent as-is."""
+
+    media_type = "application/json"
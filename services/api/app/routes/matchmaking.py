@@ -2,15 +2,21 @@ from typing import Literal, Optional
 import os
 
 from celery import Celery
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 from pydantic import BaseModel
 
 from app import db
 from app.services.matchmaking_service import (
     enqueue_player, dequeue_player, get_queue_status,
-    get_match_by_id, list_latest_matches, report_result_with_task
+    get_match_json_versioned, get_match_version, list_latest_matches_json,
+    report_result_with_task
 )
-from app.security import check_api_key
+from app.http_cache import (
+    CACHE_IMMUTABLE, CACHE_REVALIDATE, cache_headers, etag_matches, make_etag, not_modified
+)
+from app.ratelimit import limit_api_key, limit_player
+from app.responses import RawJSONResponse
+from app.security import require_scope
 
 
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://redis:6379/0")
@@ -34,35 +40,48 @@ class ResultIn(BaseModel):
     winner_team: Literal["teamA", "teamB"]
 
 # --- Routes ---
-@router.post("/queue")
-def enqueue(body: EnqueueIn, _: None = Depends(check_api_key)):
-    with db.engine.begin() as conn:
+@router.post("/queue", dependencies=[Depends(require_scope("queue"))])
+def enqueue(body: EnqueueIn, _: None = Depends(limit_api_key)):
+    limit_player(body.player_id)
+    with db.write_conn(body.player_id) as conn:
         result = enqueue_player(conn, body.player_id, body.constraints)
     return result
 
-@router.delete("/queue/{player_id}")
-def dequeue(player_id: str, _: None = Depends(check_api_key)):
-    with db.engine.begin() as conn:
+@router.delete("/queue/{player_id}", dependencies=[Depends(require_scope("queue"))])
+def dequeue(player_id: str, _: None = Depends(limit_api_key)):
+    limit_player(player_id)
+    with db.write_conn(player_id) as conn:
         return dequeue_player(conn, player_id)
 
 @router.get("/queue/{player_id}", response_model=QueueStatusOut)
 def queue_status(player_id: str):
-    with db.engine.begin() as conn:
+    with db.read_conn(player_id) as conn:
         return get_queue_status(conn, player_id)
 
-@router.get("/match/{match_id}")
-def get_match(match_id: str):
-    with db.engine.begin() as conn:
-        return get_match_by_id(conn, match_id)
+def _match_cache_control(status: str) -> str:
+    return CACHE_IMMUTABLE if status in ("finished", "expired") else CACHE_REVALIDATE
+
+@router.get("/match/{match_id}", response_class=RawJSONResponse)
+def get_match(match_id: str, request: Request):
+    with db.read_conn(f"match:{match_id}") as conn:
+        if request.headers.get("if-none-match"):
+            version, status = get_match_version(conn, match_id)
+            etag = make_etag("m", version)
+            if etag_matches(request, etag):
+                return not_modified(etag, _match_cache_control(status))
+        doc, version, status = get_match_json_versioned(conn, match_id)
+    return RawJSONResponse(
+        doc, headers=cache_headers(make_etag("m", version), _match_cache_control(status))
+    )
 
-@router.get("/matches/latest")
+@router.get("/matches/latest", response_class=RawJSONResponse)
 def latest_matches(limit: int = Query(5, ge=1, le=100)):
-    with db.engine.begin() as conn:
-        return list_latest_matches(conn, limit)
+    with db.read_conn() as conn:
+        return RawJSONResponse(list_latest_matches_json(conn, limit))
 
-@router.post("/match/{match_id}/result")
-def report_result(match_id: str, body: ResultIn, _: None = Depends(check_api_key)):
+@router.post("/match/{match_id}/result", dependencies=[Depends(require_scope("results"))])
+def report_result(match_id: str, body: ResultIn, _: None = Depends(limit_api_key)):
     def _send_task(name: str, args: list) -> None:
         celery_app.send_task(name, args=args)
-    with db.engine.begin() as conn:
+    with db.write_conn(f"match:{match_id}") as conn:
         return report_result_with_task(conn, match_id, body.winner_team, _send_task)
@@ -1,12 +1,14 @@
 import os, json
 import uuid
 
-from fastapi import APIRouter, HTTPException, Header
+from fastapi import APIRouter, HTTPException, Header, Request
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from sqlalchemy import text
 
 from ..security import create_access_token
-from ..db import engine
+from .. import db
+from ..http_cache import CACHE_REVALIDATE, cache_headers, etag_matches, make_etag, not_modified
 
 
 router = APIRouter(prefix="/players", tags=["players"])
@@ -18,50 +20,71 @@ class RegisterIn(BaseModel):
     region: str = "EUW"
 
 
+# leaderboard responses may be cached briefly without revalidating
+LEADERBOARD_CACHE = "public, max-age=5"
+
+# served by players_conservative_rating_idx; the ORDER BY expression must match the index
+_LEADERBOARD_SQL = """
+    SELECT username, mu, sigma, (mu - 3*sigma) AS cr
+    FROM players
+    ORDER BY cr DESC
+    LIMIT :lim
+"""
+
+
 @router.get("/player/{player_id}")
-def get_player(player_id: str):
-    with engine.begin() as conn:
+def get_player(player_id: str, request: Request):
+    with db.read_conn(player_id) as conn:
+        if request.headers.get("if-none-match"):
+            version = conn.execute(
+                text("SELECT rating_version FROM players WHERE player_id = :pid"),
+                {"pid": player_id}
+            ).scalar()
+            if version is not None and etag_matches(request, make_etag("p", version)):
+                return not_modified(make_etag("p", version), CACHE_REVALIDATE)
+
         player = conn.execute(
-            text("SELECT player_id, region, mu, sigma, last_active FROM players WHERE player_id = :pid"),
+            text("SELECT player_id, region, mu, sigma, last_active, rating_version FROM players WHERE player_id = :pid"),
             {"pid": player_id}
         ).mappings().first()
 
         if not player:
             raise HTTPException(status_code=404, detail=f"Player {player_id} not found!")
 
-        return {
+        body = {
             "player_id": player["player_id"],
             "mu": player["mu"],
             "sigma": player["sigma"],
             "conservative_rating": player["mu"] - 3.0 * player["sigma"],
             "last_active": player["last_active"].isoformat() if player["last_active"] else None,
         }
+    return ORJSONResponse(body, headers=cache_headers(make_etag("p", player["rating_version"]), CACHE_REVALIDATE))
 
 @router.get("/leaderboard")
-def leaderboard(limit: int = 20):
+def leaderboard(request: Request, limit: int = 20):
     if limit < 1 or limit > 100:
         limit = 20
-    with engine.begin() as conn:
-        rows = conn.execute(
-            text("""
-                SELECT username, mu, sigma, (mu - 3*sigma) AS cr
-                FROM players
-                ORDER BY cr DESC
-                LIMIT :lim
-            """),
-            {"lim": limit},
-        ).mappings().all()
-
-    return [
-        {
-            "rank": i+1,
-            "username": r["username"],
-            "mu": r["mu"],
-            "sigma": r["sigma"],
-            "conservative_rating": r["cr"],
-        }
-        for i, r in enumerate(rows)
-    ]
+    with db.read_conn() as conn:
+        # moves when a rating change or registration commits (see db.rating_epoch)
+        version = conn.execute(text("SELECT SUM(version) FROM rating_epoch")).scalar_one()
+        etag = make_etag(f"lb{limit}", version)
+        if etag_matches(request, etag):
+            return not_modified(etag, LEADERBOARD_CACHE)
+        rows = conn.execute(text(_LEADERBOARD_SQL), {"lim": limit}).mappings().all()
+
+    return ORJSONResponse(
+        [
+            {
+                "rank": i+1,
+                "username": r["username"],
+                "mu": r["mu"],
+                "sigma": r["sigma"],
+                "conservative_rating": r["cr"],
+            }
+            for i, r in enumerate(rows)
+        ],
+        headers=cache_headers(etag, LEADERBOARD_CACHE),
+    )
 
 # Very simplified for this project purposes,
 # I wanna focus on handling large amounts of users and this approach makes it easy to spawn tons of them
@@ -73,12 +96,13 @@ def register(body: RegisterIn, x_idempotency_key: str | None = Header(None)):
             if x_idempotency_key
             else str(uuid.uuid4())
         )
-    with engine.begin() as conn:
+    with db.write_conn(player_id) as conn:
         conn.execute(
-            text("""INSERT INTO players (player_id, username, region, mu, sigma, last_active)
-                    VALUES (:pid, :username, :reg, 25.0, 8.333, NOW() AT TIME ZONE 'UTC')
+            text("""INSERT INTO players (player_id, username, region, mu, sigma, last_active, rating_version)
+                    VALUES (:pid, :username, :reg, 25.0, 8.333, NOW() AT TIME ZONE 'UTC', nextval('rating_version_seq'))
                     ON CONFLICT (player_id) DO NOTHING"""),
             {"pid": player_id, "username": body.username, "reg": body.region},
         )
+        conn.execute(text(db.BUMP_RATING_EPOCH_SQL))
     token = create_access_token(sub=player_id, roles=["player"])
     return {"player_id": player_id, "access_token": token, "token_type": "bearer"}
@@ -1,4 +1,5 @@
-import os
+import os, threading, time
+from collections import OrderedDict
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 
@@ -10,6 +11,8 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 JWT_SECRET = os.getenv("JWT_SECRET", "dev-secret-default")
 JWT_ALG = "HS256"
 ACCESS_TTL_MIN = int(os.getenv("ACCESS_TTL_MIN", "120"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "50000"))
+TOKEN_CACHE_TTL_S = float(os.getenv("TOKEN_CACHE_TTL_S", "300"))
 
 bearer = HTTPBearer(auto_error=False)
 
@@ -23,11 +26,54 @@ def create_access_token(sub: str, roles: list[str] = ["player"]) -> str:
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALG)
 
+class ClaimsCache:
+    """Bounded LRU of verified token claims; an entry never outlives the token's exp."""
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE, ttl_s: float = TOKEN_CACHE_TTL_S):
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[str, tuple[dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str, now: float) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            claims, expires_at = entry
+            if expires_at <= now:
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return claims
+
+    def put(self, token: str, claims: dict, now: float) -> None:
+        expires_at = min(float(claims.get("exp", now + self.ttl_s)), now + self.ttl_s)
+        with self._lock:
+            self._entries[token] = (claims, expires_at)
+            self._entries.move_to_end(token)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = ClaimsCache()
+
 def parse_token(token: str) -> dict:
+    # wall clock on purpose: exp is a unix timestamp
+    now = time.time()
+    claims = token_cache.get(token, now)
+    if claims is not None:
+        return claims
     try:
-        return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
+        claims = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    token_cache.put(token, claims, now)
+    return claims
     
 
 def get_current_player(creds: HTTPAuthorizationCredentials = Depends(bearer)):
@@ -43,8 +89,42 @@ def require_app_key(x_api_key: str | None = None):
     expected = os.getenv("APP_API_KEY")
     if not expected or x_api_key != expected:
         raise HTTPException(status_code=401, detail="Invalid API key")
-    
-    
-async def check_api_key(x_api_key: Optional[str] = Header(None)):
-    if x_api_key != os.getenv("API_KEY", "dev"):
+
+
+# --- API keys ---
+# API_KEYS="key1:queue|results,key2:*" (or the same, one per line, in API_KEYS_FILE);
+# without either the single API_KEY gets every scope
+def load_api_keys() -> dict[str, frozenset[str]]:
+    spec = os.getenv("API_KEYS")
+    path = os.getenv("API_KEYS_FILE")
+    if path:
+        with open(path) as f:
+            spec = f.read()
+    if not spec:
+        return {os.getenv("API_KEY", "dev"): frozenset({"*"})}
+    keys = {}
+    for part in filter(None, (p.strip() for p in spec.replace("\n", ",").split(","))):
+        key, _, scopes = part.partition(":")
+        keys[key] = frozenset(filter(None, scopes.split("|"))) or frozenset({"*"})
+    return keys
+
+_api_keys = load_api_keys()
+
+def reload_api_keys() -> None:
+    """Re-read API keys (swapped atomically); the API calls this on SIGHUP."""
+    global _api_keys
+    _api_keys = load_api_keys()
+
+
+async def check_api_key(x_api_key: Optional[str] = Header(None)) -> frozenset[str]:
+    scopes = _api_keys.get(x_api_key) if x_api_key is not None else None
+    if scopes is None:
         raise HTTPException(status_code=401, detail="invalid api key")
+    return scopes
+
+
+def require_scope(scope: str):
+    async def _check(scopes: frozenset[str] = Depends(check_api_key)):
+        if scope not in scopes and "*" not in scopes:
+            raise HTTPException(status_code=403, detail=f"api key lacks scope '{scope}'")
+    return _check
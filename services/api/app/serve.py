@@ -0,0 +1,30 @@
+"""
+Multi-worker API launcher: `python -m app.serve`.
+
+Runs the app under gunicorn with WEB_CONCURRENCY uvicorn workers and prometheus_client
+multiprocess mode, so /metrics aggregates every worker instead of whichever one answers the
+scrape. In-process state (rate limit buckets, token cache) stays per worker; read-your-writes
+stickiness also travels in a cookie (see db.StickyReadMiddleware).
+"""
+import os
+import shutil
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus_multiproc")
+
+
+def prepare_multiproc_dir(path: str = MULTIPROC_DIR) -> str:
+    # files from a previous run would be merged into the new totals
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    return path
+
+
+def main() -> None:
+    # must be in the environment before any worker imports prometheus_client
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = prepare_multiproc_dir()
+    conf = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gunicorn_conf.py")
+    os.execvp("gunicorn", ["gunicorn", "-c", conf, "app.main:app"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+from __future__ import annotations
+from typing import Dict, Iterable, Mapping, Optional
+
+from fastapi import HTTPException
+
+# Matchmaking constraints are compiled once, at enqueue time, into plain queue columns so the
+# matcher never has to parse JSON inside a tick:
+#   {"party_id": "p1", "party_size": 2}  -> party_id, party_size (members share a team)
+#   {"roles": ["mid", "support"]}         -> role_mask (bit per role, 0 = any)
+#   {"rating_range": [20.0, 30.0]}        -> rating_min / rating_max (bounds on the mu of every
+#                                            lobby member, the player included)
+ROLES = ("top", "jungle", "mid", "bot", "support")
+ROLE_BITS = {r: 1 << i for i, r in enumerate(ROLES)}
+MAX_PARTY_SIZE = 2  # lobbies are 2v2: a party fills at most one team
+_KEYS = {"party_id", "party_size", "roles", "rating_range"}
+
+
+def _invalid(detail: str) -> HTTPException:
+    return HTTPException(status_code=422, detail=f"invalid constraints: {detail}")
+
+
+def compile_constraints(constraints: Optional[Dict]) -> Dict:
+    """Validate enqueue constraints and return the queue column values they map to."""
+    out = {"party_id": None, "party_size": 1, "role_mask": 0, "rating_min": None, "rating_max": None}
+    if not constraints:
+        return out
+    unknown = set(constraints) - _KEYS
+    if unknown:
+        raise _invalid(f"unknown keys {sorted(unknown)}")
+
+    party_id = constraints.get("party_id")
+    if party_id is not None:
+        if not isinstance(party_id, str) or not 0 < len(party_id) <= 64:
+            raise _invalid("party_id must be a non-empty string of at most 64 characters")
+        size = constraints.get("party_size", MAX_PARTY_SIZE)
+        if not isinstance(size, int) or isinstance(size, bool) or not 1 <= size <= MAX_PARTY_SIZE:
+            raise _invalid(f"party_size must be between 1 and {MAX_PARTY_SIZE}")
+        out["party_id"], out["party_size"] = party_id, size
+    elif "party_size" in constraints:
+        raise _invalid("party_size requires party_id")
+
+    roles = constraints.get("roles")
+    if roles is not None:
+        if not isinstance(roles, list) or not all(r in ROLE_BITS for r in roles):
+            raise _invalid(f"roles must be a list of {list(ROLES)}")
+        for r in roles:
+            out["role_mask"] |= ROLE_BITS[r]
+
+    rating_range = constraints.get("rating_range")
+    if rating_range is not None:
+        if (not isinstance(rating_range, list) or len(rating_range) != 2
+                or not all(v is None or isinstance(v, (int, float)) and not isinstance(v, bool)
+                           for v in rating_range)):
+            raise _invalid("rating_range must be [min_mu, max_mu] (either may be null)")
+        lo, hi = rating_range
+        if lo is not None and hi is not None and lo > hi:
+            raise _invalid("rating_range min is above max")
+        out["rating_min"] = float(lo) if lo is not None else None
+        out["rating_max"] = float(hi) if hi is not None else None
+    return out
+
+
+def _in_range(mu: float, lo: Optional[float], hi: Optional[float]) -> bool:
+    return (lo is None or mu >= lo) and (hi is None or mu <= hi)
+
+
+def _same_single_role(a: int, b: int) -> bool:
+    return a == b and a != 0 and a & (a - 1) == 0
+
+
+def check_feasible(compiled: Dict, player: Mapping, members: Iterable[Mapping] = ()) -> None:
+    """
+    Reject compiled constraints that no lobby can ever satisfy, so they never sit in the queue.
+    player: the enqueuing player (region, mu); members: the party's other queued rows.
+    """
+    lo, hi = compiled["rating_min"], compiled["rating_max"]
+    if not _in_range(player["mu"], lo, hi):
+        raise _invalid("rating_range excludes the player's own rating")
+    members = list(members)
+    if not members:
+        return
+    if len(members) >= compiled["party_size"]:
+        raise _invalid("party is full")
+    for m in members:
+        # the matcher reads a party from one region's queue, using the first member's size
+        if m["party_size"] != compiled["party_size"]:
+            raise _invalid("party_size differs from the party's queued members")
+        if m["region"] != player["region"]:
+            raise _invalid(f"party members must share a region (party is queued in {m['region']})")
+        if not (_in_range(m["mu"], lo, hi) and _in_range(player["mu"], m["rating_min"], m["rating_max"])):
+            raise _invalid("rating_range excludes a party member")
+        if _same_single_role(compiled["role_mask"], m["role_mask"]):
+            raise _invalid("party members can only play the same single role")
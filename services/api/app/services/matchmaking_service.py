@@ -1,18 +1,31 @@
 from __future__ import annotations
 from datetime import datetime, timezone
-from typing import Callable, Dict, List, Optional, Literal
+from typing import Callable, Dict, Optional, Literal, Tuple
 
 from fastapi import HTTPException
-from sqlalchemy import text
+from sqlalchemy import bindparam, select, text
 from sqlalchemy.engine import Connection
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-from app.db import queue, matches, results
+from app.db import after_commit, queue, matches, results
+from app.queue_trace import trace_enqueue, trace_dequeue, trace_result
+from app.services.constraints import check_feasible, compile_constraints
+
+# (class, party hash) advisory lock: two members of one party enqueueing at the same moment must
+# see each other in check_feasible
+_PARTY_LOCK_CLASS = 727_004
+
+_PARTY_MEMBERS_SQL = """
+    SELECT player_id, region, mu, party_size, role_mask, rating_min, rating_max
+    FROM queue
+    WHERE party_id = :party AND player_id <> :pid
+"""
 
 Region = Literal["EUW","EUNE","NA","CHN","JPN","KR","OCE","BR","LAS","LAN"]
 
 def enqueue_player(conn, player_id: str, constraints: dict | None):
     now = datetime.now(timezone.utc)
+    compiled = compile_constraints(constraints)
 
     p = conn.execute(
         text("SELECT player_id, region, mu, sigma FROM players WHERE player_id=:pid"),
@@ -20,6 +33,16 @@ def enqueue_player(conn, player_id: str, constraints: dict | None):
     ).mappings().first()
     if not p:
         raise HTTPException(status_code=404, detail="player not registered")
+    members = []
+    if compiled["party_id"] is not None:
+        conn.execute(
+            text("SELECT pg_advisory_xact_lock(:cls, hashtext(:party))"),
+            {"cls": _PARTY_LOCK_CLASS, "party": compiled["party_id"]},
+        )
+        members = conn.execute(
+            text(_PARTY_MEMBERS_SQL), {"party": compiled["party_id"], "pid": player_id}
+        ).mappings().all()
+    check_feasible(compiled, p, members)
 
     from sqlalchemy.dialects.postgresql import insert as pg_insert
     q_up = pg_insert(queue).values(
@@ -29,6 +52,7 @@ def enqueue_player(conn, player_id: str, constraints: dict | None):
         mu=p["mu"],
         sigma=p["sigma"],
         constraints=constraints,
+        **compiled,
     ).on_conflict_do_update(
         index_elements=[queue.c.player_id],
         set_={
@@ -37,17 +61,27 @@ def enqueue_player(conn, player_id: str, constraints: dict | None):
             "mu": p["mu"],
             "sigma": p["sigma"],
             "constraints": constraints,
+            **compiled,
         },
     )
     conn.execute(q_up)
+    # traced only once committed: a rolled-back enqueue never reached the matcher
+    after_commit(conn, lambda: trace_enqueue(player_id, p["region"], p["mu"], p["sigma"]))
     return {"status": "enqueued", "player_id": player_id, "region": p["region"]}
 
 def dequeue_player(conn: Connection, player_id: str) -> Dict:
-    res = conn.execute(queue.delete().where(queue.c.player_id == player_id))
-    return {"status": "dequeued" if res.rowcount else "not_found", "player_id": player_id}
+    region = conn.execute(
+        queue.delete().where(queue.c.player_id == player_id).returning(queue.c.region)
+    ).scalar()
+    if region is None:
+        return {"status": "not_found", "player_id": player_id}
+    after_commit(conn, lambda: trace_dequeue(player_id, region))
+    return {"status": "dequeued", "player_id": player_id}
+
+_QUEUE_STATUS = queue.select().where(queue.c.player_id == bindparam("pid"))
 
 def get_queue_status(conn: Connection, player_id: str) -> Dict:
-    row = conn.execute(queue.select().where(queue.c.player_id == player_id)).mappings().first()
+    row = conn.execute(_QUEUE_STATUS, {"pid": player_id}).mappings().first()
     if not row:
         return {"player_id": player_id, "enqueued": False}
     return {
@@ -57,40 +91,57 @@ def get_queue_status(conn: Connection, player_id: str) -> Dict:
         "enqueued_at": row["enqueued_at"].isoformat() if row["enqueued_at"] else None,
     }
 
-def get_match_by_id(conn: Connection, match_id: str) -> Dict:
-    m = conn.execute(matches.select().where(matches.c.match_id == match_id)).mappings().first()
-    if not m:
+# Match documents are rendered by Postgres: the payload stored by the matcher plus the live
+# status, falling back to building it from columns for rows written before payload existed.
+_MATCH_DOC_SQL = """
+    (COALESCE(payload, jsonb_build_object(
+        'match_id', match_id, 'players', players::jsonb, 'region', region,
+        'regions', COALESCE(regions::jsonb, jsonb_build_array(region)),
+        'quality', quality, 'created_at', created_at
+    )) || jsonb_build_object('status', status))::text
+"""
+_MATCH_VERSION_SQL = "SELECT version, status FROM matches WHERE match_id = :mid"
+_MATCH_BY_ID_SQL = f"SELECT {_MATCH_DOC_SQL} AS doc, version, status FROM matches WHERE match_id = :mid"
+_LATEST_MATCHES_SQL = f"SELECT {_MATCH_DOC_SQL} FROM matches ORDER BY created_at DESC LIMIT :lim"
+
+def get_match_version(conn: Connection, match_id: str) -> Tuple[int, str]:
+    """(version, status) only - enough to validate an ETag without reading the document."""
+    row = conn.execute(
+        text(_MATCH_VERSION_SQL),
+        {"mid": match_id},
+    ).first()
+    if row is None:
         raise HTTPException(status_code=404, detail="match not found")
-    return {
-        "match_id": m["match_id"],
-        "players": m["players"],
-        "region": m["region"],
-        "quality": m["quality"],
-        "status": m["status"],
-        "created_at": m["created_at"].isoformat() if m["created_at"] else None,
-    }
+    return row.version, row.status
 
-def list_latest_matches(conn: Connection, limit: int = 5) -> List[Dict]:
-    rows = conn.execute(
-        matches.select().order_by(matches.c.created_at.desc()).limit(limit)
-    ).mappings().all()
-    return [
-        {
-            "match_id": r["match_id"],
-            "players": r["players"],
-            "region": r["region"],
-            "quality": r["quality"],
-            "status": r["status"],
-            "created_at": r["created_at"].isoformat() if r["created_at"] else None,
-        }
-        for r in rows
-    ]
+def get_match_json_versioned(conn: Connection, match_id: str) -> Tuple[str, int, str]:
+    row = conn.execute(
+        text(_MATCH_BY_ID_SQL),
+        {"mid": match_id},
+    ).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="match not found")
+    return row.doc, row.version, row.status
+
+def list_latest_matches_json(conn: Connection, limit: int = 5) -> str:
+    docs = conn.execute(
+        text(_LATEST_MATCHES_SQL),
+        {"lim": limit},
+    ).scalars().all()
+    return "[" + ",".join(docs) + "]"
 
 def report_result_db(conn: Connection, match_id: str, winner_team: Literal["teamA","teamB"]) -> Dict:
     now = datetime.now(timezone.utc)
-    m = conn.execute(matches.select().where(matches.c.match_id == match_id)).mappings().first()
-    if not m:
-        raise HTTPException(status_code=404, detail="match not found")
+    # The status check and the transition are one statement: a report racing the reaper's
+    # expiry (or another report) waits on the row lock and then re-checks status = 'pending'.
+    region = conn.execute(
+        matches.update()
+        .where(matches.c.match_id == match_id, matches.c.status == "pending")
+        .values(status="reporting", version=matches.c.version + 1)
+        .returning(matches.c.region)
+    ).scalar()
+    if region is None:
+        return _repeated_report(conn, match_id, winner_team)
 
     conn.execute(
         pg_insert(results).values(
@@ -99,9 +150,26 @@ def report_result_db(conn: Connection, match_id: str, winner_team: Literal["team
             reported_at=now,
         ).on_conflict_do_nothing()
     )
-    conn.execute(matches.update().where(matches.c.match_id == match_id).values(status="reporting"))
+    after_commit(conn, lambda: trace_result(match_id, region, winner_team))
     return {"status": "queued", "match_id": match_id, "winner_team": winner_team}
 
+def _repeated_report(conn: Connection, match_id: str, winner_team: str) -> Dict:
+    """A report for a match that is no longer pending: a client retry gets the stored outcome."""
+    m = conn.execute(
+        select(matches.c.status, results.c.winner_team)
+        .select_from(matches.outerjoin(results, results.c.match_id == matches.c.match_id))
+        .where(matches.c.match_id == match_id)
+    ).first()
+    if m is None:
+        raise HTTPException(status_code=404, detail="match not found")
+    if m.status == "expired":
+        # abandoned and closed by the matcher's reaper; ratings must not move any more
+        raise HTTPException(status_code=409, detail="match expired")
+    if m.status in ("reporting", "finished") and m.winner_team == winner_team:
+        status = "queued" if m.status == "reporting" else "finished"
+        return {"status": status, "match_id": match_id, "winner_team": winner_team}
+    raise HTTPException(status_code=409, detail=f"match {m.status}, reported winner {m.winner_team}")
+
 def report_result_with_task(
     conn: Connection,
     match_id: str,
@@ -109,5 +177,7 @@ def report_result_with_task(
     send_task: Callable[[str, list], None],
 ) -> Dict:
     out = report_result_db(conn, match_id, winner_team)
-    send_task("matcher.worker.apply_result", [match_id, winner_team])
+    # a retry while still reporting re-sends the task (apply_result skips finished matches)
+    if out["status"] == "queued":
+        send_task("matcher.worker.apply_result", [match_id, winner_team])
     return out
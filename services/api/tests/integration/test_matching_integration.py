@@ -1,13 +1,16 @@
 from datetime import datetime, timezone
+import json
 import pytest
+from fastapi import HTTPException
 from sqlalchemy import insert, text
 
 from .dbcase import DBTestCase
 from app.services.matchmaking_service import (
     enqueue_player, dequeue_player, get_queue_status,
-    get_match_by_id, list_latest_matches, report_result_db, report_result_with_task
+    report_result_db, report_result_with_task,
+    get_match_json_versioned, list_latest_matches_json, get_match_version
 )
-from app.db import matches
+from app.db import BUMP_RATING_EPOCH_SQL, RATING_EPOCH_SHARDS, matches
 
 @pytest.mark.integration
 class TestMatchmaking(DBTestCase):
@@ -19,7 +22,7 @@ class TestMatchmaking(DBTestCase):
         ), {"pid": pid, "name": name, "region": region, "mu": mu, "sigma": sigma})
         self.session.flush()
 
-    def seed_match(self, mid="m1", region="EUW", status="created", quality=0.7, teamA=None, teamB=None):
+    def seed_match(self, mid="m1", region="EUW", status="pending", quality=0.7, teamA=None, teamB=None):
         if teamA is None:
             teamA = [{"player_id": f"a{i}", "mu": 25.0, "sigma": 8.333} for i in range(1, 6)]
         if teamB is None:
@@ -53,19 +56,48 @@ class TestMatchmaking(DBTestCase):
         st2 = get_queue_status(self.connection, "p1")
         assert st2["enqueued"] is False
 
+    def test_enqueue_rejects_party_split_across_regions(self):
+        self.seed_player("p1")
+        self.seed_player("p2", name="Wave", region="NA")
+        enqueue_player(self.connection, "p1", {"party_id": "duo"})
+        with pytest.raises(HTTPException) as exc:
+            enqueue_player(self.connection, "p2", {"party_id": "duo"})
+        assert exc.value.status_code == 422
+        assert get_queue_status(self.connection, "p2")["enqueued"] is False
+
     def test_get_match_and_latest(self):
         self.seed_match("m1", quality=0.3)
         self.seed_match("m2", quality=0.6)
         self.seed_match("m3", quality=0.9)
 
-        m2 = get_match_by_id(self.connection, "m2")
-        assert m2["match_id"] == "m2" and m2["status"] == "created"
+        doc, version, status = get_match_json_versioned(self.connection, "m2")
+        m2 = json.loads(doc)
+        assert m2["match_id"] == "m2" and m2["status"] == "pending" and m2["quality"] == 0.6
+        assert (version, status) == get_match_version(self.connection, "m2") == (0, "pending")
 
-        latest = list_latest_matches(self.connection, limit=2)
+        latest = json.loads(list_latest_matches_json(self.connection, limit=2))
         assert len(latest) == 2
         assert latest[0]["match_id"] in {"m3","m2"}
         assert latest[0]["created_at"] is not None
 
+    def test_match_json_documents(self):
+        self.seed_match("m20", quality=0.5)
+        doc = json.loads(get_match_json_versioned(self.connection, "m20")[0])
+        assert doc["match_id"] == "m20" and doc["status"] == "pending" and doc["region"] == "EUW"
+        assert doc["regions"] == ["EUW"]
+        assert len(doc["players"]["teamA"]) == 5
+
+        # stored payload is served as-is, status still comes from the row
+        self.session.execute(text(
+            "UPDATE matches SET payload = CAST(:p AS JSONB), status = 'reporting' WHERE match_id = 'm20'"
+        ), {"p": json.dumps({"match_id": "m20", "players": {}, "region": "EUW", "quality": 0.5, "created_at": "x"})})
+        self.session.flush()
+        doc = json.loads(get_match_json_versioned(self.connection, "m20")[0])
+        assert doc["players"] == {} and doc["status"] == "reporting"
+
+        latest = json.loads(list_latest_matches_json(self.connection, limit=1))
+        assert len(latest) == 1 and latest[0]["match_id"] == "m20"
+
     def test_report_result_db_and_task(self):
         self.seed_match("m10")
         sent = []
@@ -83,3 +115,53 @@ class TestMatchmaking(DBTestCase):
         assert res == "teamA"
 
         assert sent == [("matcher.worker.apply_result", ["m10", "teamA"])]
+
+    def test_report_result_bumps_match_version(self):
+        self.seed_match("m11")
+        v0, _ = get_match_version(self.connection, "m11")
+        report_result_db(self.connection, "m11", "teamB")
+        v1, status = get_match_version(self.connection, "m11")
+        assert v1 == v0 + 1 and status == "reporting"
+
+    def test_report_result_rejected_when_expired(self):
+        self.seed_match("m12", status="expired")
+        with pytest.raises(HTTPException) as exc:
+            report_result_db(self.connection, "m12", "teamA")
+        assert exc.value.status_code == 409
+        assert self.session.execute(
+            text("SELECT COUNT(*) FROM results WHERE match_id = 'm12'")
+        ).scalar_one() == 0
+        assert get_match_version(self.connection, "m12") == (0, "expired")
+
+    def test_report_result_retry_gets_the_stored_outcome(self):
+        for status, answer in (("reporting", "queued"), ("finished", "finished")):
+            mid = f"m13-{status}"
+            self.seed_match(mid, status=status)
+            self.session.execute(
+                text("INSERT INTO results (match_id, winner_team, reported_at) VALUES (:mid, 'teamA', now())"),
+                {"mid": mid},
+            )
+            sent = []
+            out = report_result_with_task(self.connection, mid, "teamA", lambda *a: sent.append(a))
+            assert out == {"status": answer, "match_id": mid, "winner_team": "teamA"}
+            assert len(sent) == (1 if status == "reporting" else 0)
+
+            with pytest.raises(HTTPException) as exc:
+                report_result_db(self.connection, mid, "teamB")
+            assert exc.value.status_code == 409
+            assert self.session.execute(
+                text("SELECT winner_team FROM results WHERE match_id = :mid"), {"mid": mid}
+            ).scalar_one() == "teamA"
+            assert get_match_version(self.connection, mid) == (0, status)
+
+    def test_report_result_unknown_match(self):
+        with pytest.raises(HTTPException) as exc:
+            report_result_db(self.connection, "nope", "teamA")
+        assert exc.value.status_code == 404
+
+    def test_rating_epoch_bump_moves_leaderboard_version(self):
+        total = lambda: self.session.execute(text("SELECT SUM(version) FROM rating_epoch")).scalar_one()
+        assert self.session.execute(text("SELECT COUNT(*) FROM rating_epoch")).scalar_one() == RATING_EPOCH_SHARDS
+        before = total()
+        self.session.execute(text(BUMP_RATING_EPOCH_SQL))
+        assert total() == before + 1
@@ -0,0 +1,215 @@
+"""
+Query-plan regression suite for the hot SQL statements of the API and the matcher.
+
+Seeds realistic volumes inside the test transaction, runs EXPLAIN (ANALYZE, BUFFERS) on every
+registered query and fails on sequential scans or on blown buffer budgets, so a schema change
+cannot silently turn an index lookup into a full scan.
+
+Register new hot statements in HOT_QUERIES, always by importing the constant the code runs;
+the matcher's live in services/matcher/sql.py (no dependencies, importable from here).
+Latency is only checked when QUERY_PLAN_MAX_MS is set: buffer counts are deterministic,
+wall-clock time on a shared CI runner is not.
+"""
+import json
+import os
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from .dbcase import DBTestCase
+from app.routes.players import _LEADERBOARD_SQL
+from app.services.matchmaking_service import (
+    _LATEST_MATCHES_SQL, _MATCH_BY_ID_SQL, _MATCH_VERSION_SQL, _PARTY_MEMBERS_SQL, _QUEUE_STATUS
+)
+
+# services/ on the path: the matcher is imported as the `matcher` package, as in its image
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+from matcher import sql as matcher_sql  # noqa: E402
+
+SCALE = int(os.getenv("QUERY_PLAN_SCALE", "1"))
+N_PLAYERS = 100_000 * SCALE
+N_QUEUE = 20_000 * SCALE
+N_MATCHES = 100_000 * SCALE
+# opt-in wall-clock budget per statement (ms); 0 = not checked
+MAX_MS = float(os.getenv("QUERY_PLAN_MAX_MS", "0"))
+
+NOW = datetime.now(timezone.utc)
+KEYSET_START = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+@dataclass(frozen=True)
+class HotQuery:
+    name: str
+    sql: str
+    params: dict
+    # shared buffers hit + read for the whole plan
+    max_buffers: int = 100
+    # True: a matcher statement sent straight to psycopg (%(name)s placeholders)
+    raw: bool = False
+    no_seq_scan_on: tuple = ("players", "queue", "matches", "results")
+
+
+HOT_QUERIES = [
+    HotQuery(
+        "fetch_window_locked",
+        matcher_sql.FETCH_WINDOW,
+        {"r": "OCE", "after_ts": KEYSET_START, "after_id": "", "n": 32},
+        raw=True,
+    ),
+    HotQuery(
+        "fetch_window_locked_next_page",
+        matcher_sql.FETCH_WINDOW,
+        {"r": "OCE", "after_ts": NOW - timedelta(minutes=5), "after_id": "qp5", "n": 32},
+        raw=True,
+    ),
+    HotQuery(
+        "fetch_party_members_locked",
+        matcher_sql.FETCH_PARTY,
+        {"r": "EUW", "parties": ["qparty10", "qparty20"], "have": ["qp10"]},
+        raw=True,
+    ),
+    HotQuery(
+        "queue_count_region",
+        matcher_sql.QUEUE_COUNT,
+        {"r": "EUW"},
+        raw=True,
+        # counts every queued row of the region; uncommitted rows defeat index-only scans
+        max_buffers=5_000 * SCALE,
+    ),
+    HotQuery(
+        "players_by_id",
+        matcher_sql.PLAYERS_BY_ID,
+        {"ids": ["qp1", "qp2", "qp3", "qp4"]},
+        raw=True,
+    ),
+    HotQuery("fetch_match_locked", matcher_sql.FETCH_MATCH, {"mid": "qm42"}, raw=True),
+    HotQuery("enqueue_party_members", _PARTY_MEMBERS_SQL, {"party": "qparty10", "pid": "qp10"}),
+    HotQuery("leaderboard", _LEADERBOARD_SQL, {"lim": 100}, max_buffers=400),
+    HotQuery("latest_matches", _LATEST_MATCHES_SQL, {"lim": 100}, max_buffers=600),
+    HotQuery("match_by_id", _MATCH_BY_ID_SQL, {"mid": "qm42"}),
+    HotQuery("match_version", _MATCH_VERSION_SQL, {"mid": "qm42"}),
+    HotQuery(
+        "reaper_stuck_reporting",
+        matcher_sql.STUCK_REPORTING,
+        {"cutoff": NOW - timedelta(minutes=5), "after_ts": KEYSET_START, "after_id": "", "n": 100},
+        max_buffers=2_000,
+    ),
+    HotQuery(
+        "unfinished_backlog",
+        matcher_sql.UNFINISHED_BACKLOG,
+        {},
+        # every unfinished match (2% of the seeded history), never the finished ones
+        max_buffers=2_500 * SCALE,
+    ),
+    HotQuery(
+        "queue_status",
+        # the Core statement get_queue_status runs, compiled as psycopg receives it
+        str(_QUEUE_STATUS.compile(dialect=postgresql.psycopg.dialect())),
+        {"pid": "qp7"},
+        raw=True,
+    ),
+    # Writes last: EXPLAIN ANALYZE executes them (inside the test transaction, rolled back).
+    HotQuery(
+        "update_player",
+        matcher_sql.UPDATE_PLAYER,
+        {"mu": 26.0, "sigma": 8.0, "pid": "qp3"},
+        raw=True,
+    ),
+    HotQuery("finish_match", matcher_sql.FINISH_MATCH, {"mid": "qm43"}, raw=True),
+    HotQuery("dequeue_matched", matcher_sql.DELETE_QUEUE, {"pids": ["qp11", "qp12", "qp13", "qp14"]}, raw=True),
+    HotQuery(
+        "rating_decay_chunk",
+        matcher_sql.DECAY_CHUNK,
+        {
+            "cutoff": NOW - timedelta(days=14), "after_ts": KEYSET_START, "after_id": "", "n": 1000,
+            "step": 0.5, "max_sigma": 8.333,
+        },
+        # 1000 non-HOT updates (sigma is in players_conservative_rating_idx): heap + every index
+        max_buffers=25_000,
+    ),
+    HotQuery(
+        "reaper_expire_pending",
+        matcher_sql.EXPIRE_PENDING,
+        {"cutoff": NOW - timedelta(hours=6), "n": 100},
+        # 100 updates; status is in matches_unfinished_idx's predicate, so none are HOT
+        max_buffers=3_000,
+    ),
+]
+
+
+def _walk(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk(child)
+
+
+@pytest.mark.integration
+class TestQueryPlans(DBTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        regions = "ARRAY['EUW','EUNE','NA','CHN','JPN','KR','OCE','BR','LAS','LAN']"
+        conn = cls.connection
+        conn.execute(text(f"""
+            INSERT INTO players (player_id, username, region, mu, sigma, last_active)
+            SELECT 'qp' || g, 'qp_user' || g, ({regions})[1 + g % 10]::regions_enum,
+                   15 + (g % 200) / 10.0, 1 + (g % 70) / 10.0,
+                   NOW() - (g % 365) * INTERVAL '1 day'
+            FROM generate_series(1, :n) g
+        """), {"n": N_PLAYERS})
+        # every fifth queued player is in a two-player party (qp10+qp11 -> qparty10, ...)
+        conn.execute(text("""
+            INSERT INTO queue (player_id, enqueued_at, region, mu, sigma, party_id, party_size)
+            SELECT player_id, NOW() - (random() * INTERVAL '10 minutes'), region, mu, sigma,
+                   CASE WHEN g % 10 < 2 THEN 'qparty' || (g - g % 2) END,
+                   CASE WHEN g % 10 < 2 THEN 2 ELSE 1 END
+            FROM players, LATERAL (SELECT substr(player_id, 3)::int AS g) n
+            WHERE player_id LIKE 'qp%' LIMIT :n
+        """), {"n": N_QUEUE})
+        team = [{"player_id": "qp1", "mu": 25.0, "sigma": 8.333}] * 2
+        conn.execute(text(f"""
+            INSERT INTO matches (match_id, players, created_at, region, quality, status, payload)
+            SELECT 'qm' || g, CAST(:players AS JSON), NOW() - g * INTERVAL '1 second',
+                   ({regions})[1 + g % 10]::regions_enum, 0.5,
+                   CASE g % 100 WHEN 0 THEN 'pending' WHEN 1 THEN 'reporting' ELSE 'finished' END,
+                   jsonb_build_object('match_id', 'qm' || g, 'players', CAST(:players AS JSONB))
+            FROM generate_series(1, :n) g
+        """), {"n": N_MATCHES, "players": json.dumps({"teamA": team, "teamB": team})})
+        conn.execute(text("""
+            INSERT INTO results (match_id, winner_team, reported_at)
+            SELECT match_id, 'teamA', created_at + INTERVAL '20 minutes'
+            FROM matches WHERE match_id LIKE 'qm%' AND status IN ('reporting', 'finished')
+        """))
+        # ANALYZE counts rows inserted by our own open transaction
+        conn.execute(text("ANALYZE players, queue, matches, results"))
+
+    def _explain(self, q: HotQuery) -> dict:
+        explain = f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {q.sql}"
+        if q.raw:
+            # straight to psycopg, placeholders and all, as the worker sends it
+            out = self.connection.exec_driver_sql(explain, q.params).scalar_one()
+        else:
+            out = self.connection.execute(text(explain), q.params).scalar_one()
+        return (json.loads(out) if isinstance(out, str) else out)[0]
+
+    def test_hot_query_plans(self):
+        for q in HOT_QUERIES:
+            with self.subTest(query=q.name):
+                plan = self._explain(q)
+                root = plan["Plan"]
+                nodes = list(_walk(root))
+
+                seq = [n["Relation Name"] for n in nodes
+                       if n["Node Type"] == "Seq Scan" and n.get("Relation Name") in q.no_seq_scan_on]
+                assert not seq, f"{q.name}: sequential scan on {seq}\n{json.dumps(root, indent=1)}"
+
+                buffers = root.get("Shared Hit Blocks", 0) + root.get("Shared Read Blocks", 0)
+                assert buffers <= q.max_buffers, f"{q.name}: {buffers} buffers > budget {q.max_buffers}"
+
+                ms = plan["Execution Time"]
+                assert not MAX_MS or ms <= MAX_MS, f"{q.name}: {ms:.1f} ms > budget {MAX_MS} ms"
@@ -0,0 +1,62 @@
+import pytest
+from fastapi import HTTPException
+
+from app.services.constraints import ROLE_BITS, check_feasible, compile_constraints
+
+
+@pytest.mark.unit
+def test_no_constraints_compile_to_defaults():
+    assert compile_constraints(None) == {
+        "party_id": None, "party_size": 1, "role_mask": 0, "rating_min": None, "rating_max": None,
+    }
+
+
+@pytest.mark.unit
+def test_compile_constraints():
+    out = compile_constraints({"party_id": "p1", "roles": ["mid", "support"], "rating_range": [20, None]})
+    assert out["party_id"] == "p1"
+    assert out["party_size"] == 2
+    assert out["role_mask"] == ROLE_BITS["mid"] | ROLE_BITS["support"]
+    assert (out["rating_min"], out["rating_max"]) == (20.0, None)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("constraints", [
+    {"colour": "blue"},
+    {"party_id": ""},
+    {"party_id": "p1", "party_size": 3},
+    {"party_size": 2},
+    {"roles": ["healer"]},
+    {"rating_range": [30, 20]},
+    {"rating_range": [20]},
+])
+def test_invalid_constraints_are_rejected(constraints):
+    with pytest.raises(HTTPException) as exc:
+        compile_constraints(constraints)
+    assert exc.value.status_code == 422
+
+
+def _member(region="EUW", mu=25.0, size=2, roles=0, lo=None, hi=None):
+    return {"region": region, "mu": mu, "party_size": size, "role_mask": roles, "rating_min": lo, "rating_max": hi}
+
+
+@pytest.mark.unit
+def test_feasible_party_is_accepted():
+    compiled = compile_constraints({"party_id": "p1", "roles": ["mid"], "rating_range": [20, 30]})
+    check_feasible(compiled, {"region": "EUW", "mu": 25.0}, [_member(roles=ROLE_BITS["support"], lo=20)])
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("constraints,mu,members", [
+    ({"rating_range": [30, 40]}, 25.0, []),
+    ({"party_id": "p1"}, 25.0, [_member(region="NA")]),
+    ({"party_id": "p1", "roles": ["mid"]}, 25.0, [_member(roles=ROLE_BITS["mid"])]),
+    ({"party_id": "p1", "rating_range": [None, 24]}, 20.0, [_member(mu=25.0)]),
+    ({"party_id": "p1"}, 25.0, [_member(hi=20)]),
+    ({"party_id": "p1"}, 25.0, [_member(size=1)]),
+    ({"party_id": "p1"}, 25.0, [_member(), _member()]),
+])
+def test_infeasible_constraints_are_rejected(constraints, mu, members):
+    with pytest.raises(HTTPException) as exc:
+        check_feasible(compile_constraints(constraints), {"region": "EUW", "mu": mu}, members)
+    assert exc.value.status_code == 422
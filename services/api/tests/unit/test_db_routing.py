@@ -0,0 +1,120 @@
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import db
+
+
+class _FakeEngine:
+    def __init__(self, name):
+        self.name = name
+
+    @contextmanager
+    def begin(self):
+        yield SimpleNamespace(name=self.name, info={})
+
+
+@pytest.mark.unit
+def test_reads_use_primary_without_replica(monkeypatch):
+    monkeypatch.setattr(db, "engine", _FakeEngine("primary"))
+    monkeypatch.setattr(db, "read_engine", None)
+    with db.read_conn("p1") as conn:
+        assert conn.name == "primary"
+
+
+@pytest.mark.unit
+def test_reads_stick_to_primary_after_own_write(monkeypatch):
+    monkeypatch.setattr(db, "engine", _FakeEngine("primary"))
+    monkeypatch.setattr(db, "read_engine", _FakeEngine("replica"))
+    monkeypatch.setattr(db, "recent_writes", db._RecentWrites(window_s=60, max_keys=10))
+
+    with db.read_conn("p1") as conn:
+        assert conn.name == "replica"
+    with db.write_conn("p1") as conn:
+        assert conn.name == "primary"
+    with db.read_conn("p1") as conn:
+        assert conn.name == "primary"
+    with db.read_conn("p2") as conn:
+        assert conn.name == "replica"
+    with db.read_conn() as conn:
+        assert conn.name == "replica"
+
+
+@pytest.mark.unit
+def test_sticky_cookie_carries_reads_to_primary_across_workers(monkeypatch):
+    monkeypatch.setattr(db, "engine", _FakeEngine("primary"))
+    monkeypatch.setattr(db, "read_engine", _FakeEngine("replica"))
+    app = FastAPI()
+    app.add_middleware(db.StickyReadMiddleware, window_s=60)
+
+    @app.post("/w/{pid}")
+    def write(pid: str):
+        with db.write_conn(pid):
+            return {}
+
+    @app.get("/r/{pid}")
+    def read(pid: str):
+        with db.read_conn(pid) as conn:
+            return {"pool": conn.name}
+
+    client = TestClient(app)
+    resp = client.post("/w/p1")
+    assert db.STICKY_COOKIE in resp.cookies
+    # another worker answers the read: it never saw the write, only the cookie
+    monkeypatch.setattr(db, "recent_writes", db._RecentWrites(window_s=60, max_keys=10))
+    assert client.get("/r/p1").json() == {"pool": "primary"}
+    assert TestClient(app).get("/r/p1").json() == {"pool": "replica"}
+
+    client.cookies.set(db.STICKY_COOKIE, "1.0")
+    assert client.get("/r/p1").json() == {"pool": "replica"}
+
+
+@pytest.mark.unit
+def test_after_commit_hooks_run_only_on_commit(monkeypatch):
+    monkeypatch.setattr(db, "engine", _FakeEngine("primary"))
+    ran = []
+    with db.write_conn() as conn:
+        db.after_commit(conn, lambda: ran.append("ok"))
+        assert ran == []
+    assert ran == ["ok"] and db._AFTER_COMMIT not in conn.info
+
+    with pytest.raises(RuntimeError):
+        with db.write_conn() as conn:
+            db.after_commit(conn, lambda: ran.append("rolled back"))
+            raise RuntimeError
+    assert ran == ["ok"]
+
+
+class _FakeDBAPIConnection:
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.mark.unit
+def test_pool_wait_counts_checkouts_still_blocked(monkeypatch):
+    tracker = db.PoolWaitTracker(stale_after_s=0.01)
+    monkeypatch.setattr(db, "pool_wait", tracker)
+    pool = db.TimedQueuePool(_FakeDBAPIConnection, pool_size=1, max_overflow=0, timeout=5)
+    held = pool.connect()
+    got = threading.Event()
+    blocked = threading.Thread(target=lambda: (pool.connect(), got.set()))
+    blocked.start()
+    try:
+        time.sleep(0.2)
+        # no checkout has finished within stale_after_s, yet the pool is stalled
+        assert not got.is_set()
+        assert tracker.current() >= 0.15
+    finally:
+        held.close()
+        blocked.join()
+    assert got.is_set() and tracker._waiting == {}
+    time.sleep(0.02)
+    assert tracker.current() == 0.0
@@ -0,0 +1,19 @@
+import pytest
+from starlette.requests import Request
+
+from app.http_cache import etag_matches, make_etag
+
+
+def _request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+@pytest.mark.unit
+def test_etag_matches():
+    tag = make_etag("m", 3)
+    assert etag_matches(_request(tag), tag)
+    assert etag_matches(_request(f'"m-1", W/{tag}'), tag)
+    assert etag_matches(_request("*"), tag)
+    assert not etag_matches(_request('"m-2"'), tag)
+    assert not etag_matches(_request(), tag)
@@ -0,0 +1,18 @@
+import math
+
+import pytest
+
+from app.queue_trace import EVENT_DEQUEUE, EVENT_ENQUEUE, TraceRecorder, read_trace
+
+
+@pytest.mark.unit
+def test_recorder_round_trip(tmp_path):
+    rec = TraceRecorder(str(tmp_path / "trace.bin"), flush_s=60)
+    rec.record(EVENT_ENQUEUE, "OCE", 25.0, 8.25, "p1")
+    rec.record(EVENT_DEQUEUE, None, math.nan, math.nan, "p1")
+    rec.flush()
+
+    events = list(read_trace(rec._file))
+    assert [(e.event, e.region, e.id) for e in events] == [(EVENT_ENQUEUE, "OCE", "p1"), (EVENT_DEQUEUE, None, "p1")]
+    assert events[0].mu == 25.0 and events[0].sigma == 8.25
+    assert events[0].ts <= events[1].ts
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import db, ratelimit
+from app.ratelimit import AdmissionMiddleware, BucketRegistry, TokenBucket, route_group
+
+
+@pytest.mark.unit
+def test_token_bucket_refills_at_rate():
+    b = TokenBucket(rate=2.0, burst=2.0, now=0.0)
+    assert b.take(0.0) == 0.0
+    assert b.take(0.0) == 0.0
+    # empty: next token in 1/rate seconds
+    assert b.take(0.0) == pytest.approx(0.5)
+    assert b.take(0.5) == 0.0
+
+
+@pytest.mark.unit
+def test_bucket_registry_is_per_key_and_bounded():
+    reg = BucketRegistry(rate=1.0, burst=1.0, max_keys=2)
+    assert reg.take("a", now=0.0) == 0.0
+    assert reg.take("a", now=0.0) > 0
+    assert reg.take("b", now=0.0) == 0.0
+    reg.take("c", now=0.0)  # evicts "a"
+    assert reg.take("a", now=0.0) == 0.0
+
+
+@pytest.mark.unit
+def test_route_groups():
+    assert route_group("POST", "/matchmaking/queue") == "matchmaking_write"
+    assert route_group("GET", "/matchmaking/match/m1") == "matchmaking_read"
+    assert route_group("GET", "/players/leaderboard") == "players_read"
+    assert route_group("GET", "/healthz") is None
+
+
+@pytest.mark.unit
+def test_admission_sheds_on_pool_wait(monkeypatch):
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware, limits={})
+
+    @app.get("/matchmaking/ping")
+    def ping():
+        return {"ok": True}
+
+    @app.get("/healthz")
+    def health():
+        return {"status": "ok"}
+
+    client = TestClient(app)
+    assert client.get("/matchmaking/ping").status_code == 200
+
+    monkeypatch.setattr(db.pool_wait, "current", lambda: 10.0)
+    r = client.get("/matchmaking/ping")
+    assert r.status_code == 503 and r.headers["retry-after"]
+    assert client.get("/healthz").status_code == 200
+
+
+@pytest.mark.unit
+def test_admission_sheds_on_queue_depth(monkeypatch):
+    monkeypatch.setattr(ratelimit, "ADMISSION_WAIT_S", 5.0)
+    release = asyncio.Event()
+
+    async def app(scope, receive, send):
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    mw = AdmissionMiddleware(app, limits={"matchmaking_write": 1}, max_queued=1)
+
+    async def call():
+        sent = []
+
+        async def send(msg):
+            sent.append(msg)
+
+        await mw({"type": "http", "method": "POST", "path": "/matchmaking/queue"}, None, send)
+        return sent[0]["status"]
+
+    async def scenario():
+        holder = asyncio.create_task(call())
+        queued = asyncio.create_task(call())
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert mw.waiting == 1
+        # one request holds the slot, one waits for it: the next one is shed right away
+        assert await call() == 503
+        release.set()
+        assert await holder == 200 and await queued == 200
+        assert mw.waiting == 0
+
+    asyncio.run(scenario())
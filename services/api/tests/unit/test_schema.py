@@ -0,0 +1,20 @@
+import pytest
+
+from app import db
+
+
+@pytest.mark.unit
+def test_schema_version_tracks_migrations():
+    assert db.SCHEMA_VERSION == len(db.MIGRATIONS)
+    # step 1 is the baseline create_all
+    assert callable(db.MIGRATIONS[0])
+
+
+@pytest.mark.unit
+def test_engine_is_created_lazily(monkeypatch):
+    # setitem (not delitem) so the module is restored to its previous state afterwards
+    monkeypatch.setitem(vars(db), "engine", None)
+    created = []
+    monkeypatch.setattr(db, "_make_engine", lambda dsn, label: created.append(label) or object())
+    eng = db.get_engine()
+    assert db.engine is eng and db.get_engine() is eng and created == ["primary"]
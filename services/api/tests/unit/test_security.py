@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app import security
+
+
+@pytest.mark.unit
+def test_parse_token_caches_verified_claims(monkeypatch):
+    security.token_cache.clear()
+    token = security.create_access_token("p1")
+    calls = []
+    decode = security.jwt.decode
+    monkeypatch.setattr(security.jwt, "decode", lambda *a, **kw: calls.append(1) or decode(*a, **kw))
+
+    assert security.parse_token(token)["sub"] == "p1"
+    assert security.parse_token(token)["sub"] == "p1"
+    assert len(calls) == 1
+
+
+@pytest.mark.unit
+def test_claims_cache_respects_exp():
+    cache = security.ClaimsCache(maxsize=2, ttl_s=300)
+    cache.put("t", {"sub": "p1", "exp": 100}, now=50.0)
+    assert cache.get("t", now=99.0)["sub"] == "p1"
+    assert cache.get("t", now=100.0) is None
+
+
+@pytest.mark.unit
+def test_api_key_scopes(monkeypatch):
+    monkeypatch.setenv("API_KEYS", "k1:queue,k2:*")
+    security.reload_api_keys()
+    try:
+        assert asyncio.run(security.check_api_key("k1")) == frozenset({"queue"})
+        with pytest.raises(HTTPException) as e:
+            asyncio.run(security.check_api_key("dev"))
+        assert e.value.status_code == 401
+
+        results = security.require_scope("results")
+        with pytest.raises(HTTPException) as e:
+            asyncio.run(results(frozenset({"queue"})))
+        assert e.value.status_code == 403
+        asyncio.run(results(frozenset({"*"})))
+    finally:
+        monkeypatch.delenv("API_KEYS")
+        security.reload_api_keys()
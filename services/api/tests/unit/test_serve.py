@@ -0,0 +1,14 @@
+import os
+
+import pytest
+
+from app.serve import prepare_multiproc_dir
+
+
+@pytest.mark.unit
+def test_prepare_multiproc_dir_drops_stale_files(tmp_path):
+    path = tmp_path / "prom"
+    path.mkdir()
+    (path / "counter_123.db").write_bytes(b"stale")
+    assert prepare_multiproc_dir(str(path)) == str(path)
+    assert os.listdir(path) == []
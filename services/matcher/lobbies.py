@@ -0,0 +1,152 @@
+"""
+Lobby forming for the matcher: pure functions over locked queue rows, no DB access.
+
+Rows carry the constraints compiled by the API at enqueue time (queue.party_id, party_size,
+role_mask, rating_min, rating_max), so nothing here parses JSON. A lobby is 2v2:
+  - party members always end up on the same team; a party is only matched once all of its
+    party_size members are among the candidates
+  - each team must be able to give its two players distinct roles (role_mask 0 = any role)
+  - every member's mu must lie inside every member's [rating_min, rating_max]; this is tracked
+    as a running aggregate per lobby, so adding a unit is O(1) rather than a pairwise check
+Units that can never be placed (incomplete parties, a party whose members exclude each other's
+rating or can only play the same single role) are left out rather than anchoring lobbies.
+"""
+import math
+import os
+
+BETA = float(os.getenv("MATCH_BETA", "0.1"))
+TEAM_SIZE = 2
+LOBBY_SIZE = 2 * TEAM_SIZE
+
+# index pairs of the three ways to split four players 2v2
+_SPLITS = (((0, 1), (2, 3)), ((0, 2), (1, 3)), ((0, 3), (1, 2)))
+
+
+def score_split(teamA, teamB):
+    muA = sum(p["mu"] for p in teamA) / len(teamA)
+    muB = sum(p["mu"] for p in teamB) / len(teamB)
+    sigmaA = sum(p["sigma"] for p in teamA) / len(teamA)
+    sigmaB = sum(p["sigma"] for p in teamB) / len(teamB)
+    diff = abs(muA - muB)
+    return diff + BETA * (sigmaA + sigmaB)
+
+
+def _roles_ok(team) -> bool:
+    # two players can take distinct roles unless both can only play the same single role
+    a, b = (p.get("role_mask") or 0 for p in team)
+    if not a or not b:
+        return True
+    return bin(a | b).count("1") >= 2
+
+
+def _parties_ok(teamA, teamB) -> bool:
+    parties = {p.get("party_id") for p in teamA} - {None}
+    return not any(p.get("party_id") in parties for p in teamB)
+
+
+def best_split(players4):
+    """Best valid (teamA, teamB, quality) for four players, or None if no split satisfies the constraints."""
+    p = players4
+    best = None
+    for ia, ib in _SPLITS:
+        teamA = [p[i] for i in ia]
+        teamB = [p[i] for i in ib]
+        if not (_parties_ok(teamA, teamB) and _roles_ok(teamA) and _roles_ok(teamB)):
+            continue
+        score = score_split(teamA, teamB)
+        if best is None or score < best[2]:
+            best = (teamA, teamB, score)
+    if best is None:
+        return None
+    teamA, teamB, score = best
+    return teamA, teamB, 1.0 / (1.0 + score)
+
+
+class _Unit:
+    """A solo player or a complete party; carries the aggregate used for O(1) fit checks."""
+    __slots__ = ("members", "size", "rmin", "rmax", "mu_lo", "mu_hi")
+
+    def __init__(self, members):
+        self.members = members
+        self.size = len(members)
+        self.rmin = max((m.get("rating_min") if m.get("rating_min") is not None else -math.inf) for m in members)
+        self.rmax = min((m.get("rating_max") if m.get("rating_max") is not None else math.inf) for m in members)
+        self.mu_lo = min(m["mu"] for m in members)
+        self.mu_hi = max(m["mu"] for m in members)
+
+
+def _units(rows):
+    """Rows (oldest first) -> units ordered by their oldest member; unplaceable units are left out."""
+    order, parties = [], {}
+    for r in rows:
+        pid = r.get("party_id")
+        if pid is None:
+            order.append([r])
+        elif pid in parties:
+            parties[pid].append(r)
+        else:
+            parties[pid] = [r]
+            order.append(parties[pid])
+    units = []
+    for members in order:
+        want = members[0].get("party_size") or 1
+        if len(members) != want or want > TEAM_SIZE:
+            continue
+        unit = _Unit(members)
+        # rejected at enqueue, but rows queued before that check may still carry them
+        if unit.rmin > unit.mu_lo or unit.mu_hi > unit.rmax:
+            continue
+        if unit.size == TEAM_SIZE and not _roles_ok(members):
+            continue
+        units.append(unit)
+    return units
+
+
+def matchable(rows):
+    """The rows build_lobbies could place given enough company; the oldest unit's members first."""
+    return [m for unit in _units(rows) for m in unit.members]
+
+
+def _merge(agg, unit):
+    size, rmin, rmax, mu_lo, mu_hi = agg
+    rmin, rmax = max(rmin, unit.rmin), min(rmax, unit.rmax)
+    mu_lo, mu_hi = min(mu_lo, unit.mu_lo), max(mu_hi, unit.mu_hi)
+    if rmin > mu_lo or mu_hi > rmax:
+        return None
+    return (size + unit.size, rmin, rmax, mu_lo, mu_hi)
+
+
+def build_lobbies(rows):
+    """
+    Greedy, oldest first: each still-unmatched unit anchors a lobby that is filled with the
+    next compatible units in queue order. Returns [(teamA, teamB, quality)] of rows.
+    """
+    units = _units(rows)
+    used = [False] * len(units)
+    lobbies = []
+    for i, anchor in enumerate(units):
+        if used[i]:
+            continue
+        picked = [i]
+        aggs = [(anchor.size, anchor.rmin, anchor.rmax, anchor.mu_lo, anchor.mu_hi)]
+        split = None
+        for j in range(i + 1, len(units)):
+            if used[j] or aggs[-1][0] + units[j].size > LOBBY_SIZE:
+                continue
+            agg = _merge(aggs[-1], units[j])
+            if agg is None:
+                continue
+            picked.append(j)
+            aggs.append(agg)
+            if agg[0] == LOBBY_SIZE:
+                split = best_split([m for k in picked for m in units[k].members])
+                if split is not None:
+                    break
+                # no role assignment works: drop the unit that completed the lobby, keep looking
+                picked.pop()
+                aggs.pop()
+        if split is not None:
+            for k in picked:
+                used[k] = True
+            lobbies.append(split)
+    return lobbies
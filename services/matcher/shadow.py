@@ -0,0 +1,158 @@
+"""
+Shadow matchmaking: alternative lobby builders run on the same queue windows as the live tick,
+without writing anything, so their throughput and quality can be compared before a switch.
+
+SHADOW_MATCHERS="mu_sorted" enables the named entries of MATCHERS (register new candidates with
+@register). For every region a tick walked, the rows it considered (overflow top-ups included)
+and the lobbies it finally wrote are handed to a small thread pool; the tick itself only pays
+for the submit. Each matcher's output is recorded under matcher=<name>, the live one under
+matcher=live:
+  - shadow_matches_total / shadow_players_matched_total
+  - shadow_match_quality, shadow_match_wait_seconds (wait of matched players at snapshot time)
+  - shadow_cpu_seconds (thread CPU time of one run)
+and, with SHADOW_LOG_PATH set, one JSON line per matcher and window.
+
+A thread pool rather than a process pool: Celery's prefork children are daemonic and may not
+fork their own workers. Shadow runs share the GIL with the tick, so the pool is one thread and
+windows are dropped (shadow_windows_total{outcome="dropped"}) when it falls behind.
+"""
+import json, logging, os, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from prometheus_client import Counter, Histogram
+
+from matcher.lobbies import build_lobbies
+
+SHADOW_MATCHERS = [m for m in os.getenv("SHADOW_MATCHERS", "").split(",") if m]
+SHADOW_LOG_PATH = os.getenv("SHADOW_LOG_PATH")
+SHADOW_MAX_PENDING = int(os.getenv("SHADOW_MAX_PENDING", "64"))
+
+SHADOW_MATCHES = Counter("shadow_matches_total", "Matches formed per matcher", ["matcher", "region"])
+SHADOW_PLAYERS = Counter("shadow_players_matched_total", "Players matched per matcher", ["matcher", "region"])
+SHADOW_QUALITY = Histogram(
+    "shadow_match_quality", "Quality of formed matches per matcher", ["matcher"],
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0),
+)
+SHADOW_WAIT = Histogram(
+    "shadow_match_wait_seconds", "Queue wait of matched players per matcher", ["matcher"],
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600),
+)
+SHADOW_CPU = Histogram(
+    "shadow_cpu_seconds", "CPU time of one lobby-forming run per matcher", ["matcher"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+SHADOW_WINDOWS = Counter("shadow_windows_total", "Queue windows handed to shadow matchers", ["outcome"])
+
+log = logging.getLogger("matcher.shadow")
+
+MATCHERS = {}
+
+
+def register(name: str):
+    def deco(fn):
+        MATCHERS[name] = fn
+        return fn
+    return deco
+
+
+# the live algorithm itself: a sanity check, its numbers should track matcher=live (the live
+# tick pages through the queue, this one sees all the rows at once)
+register("greedy")(build_lobbies)
+
+
+@register("mu_sorted")
+def mu_sorted(rows):
+    # same constraints, but anchors are taken in rating order: tighter lobbies, older players may wait
+    return build_lobbies(sorted(rows, key=lambda r: r["mu"]))
+
+
+class ShadowRunner:
+    def __init__(self, names, log_path=None, max_pending=SHADOW_MAX_PENDING):
+        unknown = set(names) - set(MATCHERS)
+        if unknown:
+            raise ValueError(f"unknown shadow matchers: {sorted(unknown)}")
+        self.names = list(names)
+        self.log_path = log_path
+        self.max_pending = max_pending
+        self._pool = None
+        self._pid = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        # created per process: a pool inherited over fork has no threads behind it
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow-matcher")
+            self._pending = 0
+        return self._pool
+
+    def submit(self, region, rows, live_lobbies, live_cpu_s):
+        """Hand one window and what the live tick made of it to the pool; never blocks."""
+        with self._lock:
+            # under the lock: a new pool resets the count, which must happen before it is taken
+            pool = self._executor()
+            if self._pending >= self.max_pending:
+                SHADOW_WINDOWS.labels(outcome="dropped").inc()
+                return
+            self._pending += 1
+        SHADOW_WINDOWS.labels(outcome="submitted").inc()
+        snapshot_ts = datetime.now(timezone.utc)
+        pool.submit(self._run, region, list(rows), live_lobbies, live_cpu_s, snapshot_ts)
+
+    def _run(self, region, rows, live_lobbies, live_cpu_s, snapshot_ts):
+        try:
+            lines = [self._record("live", region, rows, live_lobbies, live_cpu_s, snapshot_ts)]
+            for name in self.names:
+                try:
+                    t0 = time.thread_time()
+                    # like the live tick, count only lobbies a home-region player is in: overflow
+                    # rows from neighbours only top lobbies up
+                    lobbies = [
+                        l for l in MATCHERS[name](rows)
+                        if any(p["region"] == region for p in l[0] + l[1])
+                    ]
+                    lines.append(self._record(name, region, rows, lobbies, time.thread_time() - t0, snapshot_ts))
+                except Exception:
+                    # one broken candidate must not cost the others (or live) their numbers
+                    SHADOW_WINDOWS.labels(outcome="error").inc()
+                    log.exception("shadow matcher %s failed for region %s", name, region)
+            if self.log_path:
+                with open(self.log_path, "a") as f:
+                    f.write("".join(json.dumps(l, separators=(",", ":")) + "\n" for l in lines))
+        except Exception:
+            # a broken candidate must never surface in the live worker
+            SHADOW_WINDOWS.labels(outcome="error").inc()
+            log.exception("shadow matchers failed for region %s", region)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    @staticmethod
+    def _record(name, region, rows, lobbies, cpu_s, snapshot_ts):
+        qualities = [q for _, _, q in lobbies]
+        waits = [
+            (snapshot_ts - p["enqueued_at"]).total_seconds()
+            for teamA, teamB, _ in lobbies for p in teamA + teamB
+        ]
+        SHADOW_MATCHES.labels(matcher=name, region=region).inc(len(lobbies))
+        SHADOW_PLAYERS.labels(matcher=name, region=region).inc(len(waits))
+        for q in qualities:
+            SHADOW_QUALITY.labels(matcher=name).observe(q)
+        for w in waits:
+            SHADOW_WAIT.labels(matcher=name).observe(w)
+        SHADOW_CPU.labels(matcher=name).observe(cpu_s)
+        return {
+            "ts": round(snapshot_ts.timestamp(), 3),
+            "region": region,
+            "matcher": name,
+            "window": len(rows),
+            "matches": len(lobbies),
+            "quality_mean": round(sum(qualities) / len(qualities), 4) if qualities else None,
+            "wait_mean_s": round(sum(waits) / len(waits), 3) if waits else None,
+            "cpu_ms": round(cpu_s * 1000, 3),
+        }
+
+
+runner = ShadowRunner(SHADOW_MATCHERS, SHADOW_LOG_PATH) if SHADOW_MATCHERS else None
@@ -0,0 +1,119 @@
+"""
+SQL of the matcher, kept free of imports so the API's query-plan suite
+(services/api/tests/integration/test_query_plans.py) checks the exact statements the worker sends.
+
+Two parameter styles: hot statements run on the raw psycopg connection with %(name)s
+placeholders; the rating decay and reaper statements go through SQLAlchemy text() with :name.
+"""
+
+# --- hot path: raw psycopg, prepared and pipelined (see worker._raw) ---
+QUEUE_COLS = "player_id, mu, sigma, enqueued_at, party_id, party_size, role_mask, rating_min, rating_max"
+
+QUEUE_COUNT = "SELECT COUNT(*) FROM queue WHERE region = %(r)s"
+FETCH_WINDOW = f"""
+    SELECT {QUEUE_COLS}
+    FROM queue
+    WHERE region = %(r)s AND (enqueued_at, player_id) > (%(after_ts)s, %(after_id)s)
+    ORDER BY enqueued_at, player_id
+    FOR UPDATE SKIP LOCKED
+    LIMIT %(n)s
+"""
+FETCH_PARTY = f"""
+    SELECT {QUEUE_COLS}
+    FROM queue
+    WHERE region = %(r)s AND party_id = ANY(%(parties)s) AND player_id <> ALL(%(have)s)
+    FOR UPDATE SKIP LOCKED
+"""
+INSERT_MATCH = """
+    INSERT INTO matches (match_id, players, created_at, region, regions, quality, status, payload)
+    VALUES (%(mid)s, %(players)s, %(created_at)s, %(region)s, %(regions)s, %(quality)s, 'pending',
+            CAST(%(payload)s AS JSONB))
+"""
+DELETE_QUEUE = "DELETE FROM queue WHERE player_id = ANY(%(pids)s)"
+# FOR UPDATE: a late apply_result message and the reaper must not both apply one result
+FETCH_MATCH = "SELECT match_id, players, region, status FROM matches WHERE match_id = %(mid)s FOR UPDATE"
+PLAYERS_BY_ID = "SELECT player_id, mu, sigma FROM players WHERE player_id = ANY(%(ids)s)"
+UPDATE_PLAYER = """
+    UPDATE players
+    SET mu = %(mu)s, sigma = %(sigma)s, last_active = NOW() AT TIME ZONE 'UTC',
+        rating_version = nextval('rating_version_seq')
+    WHERE player_id = %(pid)s
+"""
+FINISH_MATCH = "UPDATE matches SET status = 'finished', version = version + 1 WHERE match_id = %(mid)s"
+# leaderboard ETag version (rating_epoch in services/api/app/db.py); no params, so % is literal
+BUMP_RATING_EPOCH = """
+    UPDATE rating_epoch SET version = version + 1
+    WHERE shard = pg_backend_pid() % (SELECT COUNT(*) FROM rating_epoch)
+"""
+INSERT_RESULT = """
+    INSERT INTO results (match_id, winner_team, reported_at)
+    VALUES (%(mid)s, %(wt)s, NOW() AT TIME ZONE 'UTC')
+    ON CONFLICT (match_id) DO NOTHING
+"""
+
+
+# --- rating decay and reaper: SQLAlchemy text() ---
+
+# one chunk of the rating decay walk (worker._decay_chunk)
+DECAY_CHUNK = """
+    WITH batch AS (
+        SELECT player_id, last_active
+        FROM players
+        WHERE last_active < :cutoff AND (last_active, player_id) > (:after_ts, :after_id)
+        ORDER BY last_active, player_id
+        LIMIT :n
+        FOR UPDATE SKIP LOCKED
+    ), upd AS (
+        UPDATE players p
+        SET sigma = LEAST(SQRT(p.sigma * p.sigma + :step * :step), :max_sigma),
+            rating_version = nextval('rating_version_seq')
+        FROM batch
+        WHERE p.player_id = batch.player_id AND p.sigma < :max_sigma
+        RETURNING 1
+    ), epoch AS (
+        UPDATE rating_epoch SET version = version + 1
+        WHERE shard = pg_backend_pid() % (SELECT COUNT(*) FROM rating_epoch)
+          AND EXISTS (SELECT 1 FROM upd)
+    )
+    SELECT b.last_active, b.player_id,
+           (SELECT COUNT(*) FROM batch) AS scanned,
+           (SELECT COUNT(*) FROM upd) AS updated
+    FROM batch b
+    ORDER BY b.last_active DESC, b.player_id DESC
+    LIMIT 1
+"""
+
+# Every reaper query filters on an unfinished status, which Postgres proves implies
+# matches_unfinished_idx's predicate, so it is planned against that small partial index,
+# never against the whole history (test_query_plans checks this).
+STUCK_REPORTING = """
+    SELECT m.match_id, m.created_at, r.winner_team
+    FROM matches m
+    JOIN results r ON r.match_id = m.match_id
+    WHERE m.status = 'reporting'
+      AND r.reported_at < :cutoff
+      AND (m.created_at, m.match_id) > (:after_ts, :after_id)
+    ORDER BY m.created_at, m.match_id
+    LIMIT :n
+"""
+EXPIRE_PENDING = """
+    WITH stale AS (
+        SELECT match_id
+        FROM matches
+        WHERE status = 'pending' AND created_at < :cutoff
+        ORDER BY created_at
+        LIMIT :n
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE matches m
+    SET status = 'expired', version = m.version + 1
+    FROM stale
+    WHERE m.match_id = stale.match_id
+    RETURNING m.match_id
+"""
+UNFINISHED_BACKLOG = """
+    SELECT status, COUNT(*) AS n, EXTRACT(EPOCH FROM NOW() - MIN(created_at)) AS oldest_s
+    FROM matches
+    WHERE status IN ('pending', 'reporting')
+    GROUP BY status
+"""
@@ -0,0 +1,12 @@
+import os, sys
+
+# the service is imported as the `matcher` package (see the Dockerfile); the schema is owned by
+# the API (app.db), so integration tests build it from there
+SERVICES_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, SERVICES_DIR)
+sys.path.insert(0, os.path.join(SERVICES_DIR, "api"))
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "unit: unit tests")
+    config.addinivalue_line("markers", "integration: db tests")
@@ -0,0 +1,60 @@
+import math
+
+import pytest
+from sqlalchemy import text
+
+from matcher import worker
+from .conftest import run_sql
+
+
+@pytest.fixture
+def players(engine, monkeypatch):
+    monkeypatch.setattr(worker, "DECAY_CHUNK_SIZE", 3)
+    monkeypatch.setattr(worker, "DECAY_CHUNK_SLEEP_S", 0)
+    cleanup = "DELETE FROM players WHERE player_id LIKE 'dk%'"
+    run_sql(engine, cleanup)
+    # seven inactive players sharing one last_active: chunks must break ties on player_id
+    run_sql(engine, """
+        INSERT INTO players (player_id, username, region, mu, sigma, last_active)
+        SELECT 'dk' || g, 'dk_user' || g, 'EUW', 25, 2.0, TIMESTAMPTZ '2020-01-01 00:00:00+00'
+        FROM generate_series(1, 7) g
+    """)
+    run_sql(engine, """
+        INSERT INTO players (player_id, username, region, mu, sigma, last_active) VALUES
+            ('dk_capped', 'dk_user_capped', 'EUW', 25, :max_sigma, TIMESTAMPTZ '2020-01-01 00:00:00+00'),
+            ('dk_active', 'dk_user_active', 'EUW', 25, 2.0, NOW())
+    """, {"max_sigma": worker.DECAY_MAX_SIGMA})
+    yield
+    run_sql(engine, cleanup)
+
+
+def _sigmas(engine):
+    rows = run_sql(engine, "SELECT player_id, sigma, rating_version FROM players WHERE player_id LIKE 'dk%'")
+    return {r.player_id: (r.sigma, r.rating_version) for r in rows}
+
+
+@pytest.mark.integration
+def test_decay_walks_every_inactive_player_once_in_chunks(engine, players):
+    out = worker.decay_inactive_ratings()
+    assert out["status"] == "ok"
+    assert out["chunks"] >= 3  # 8 inactive rows of ours at 3 per chunk
+
+    after = _sigmas(engine)
+    grown = math.sqrt(2.0 ** 2 + worker.DECAY_SIGMA_STEP ** 2)
+    for g in range(1, 8):
+        sigma, version = after[f"dk{g}"]
+        assert sigma == pytest.approx(grown)
+        assert version > 0
+    assert after["dk_capped"] == (pytest.approx(worker.DECAY_MAX_SIGMA), 0)
+    assert after["dk_active"] == (2.0, 0)
+
+
+@pytest.mark.integration
+def test_decay_skips_while_another_run_holds_the_lock(engine, players):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": worker._DECAY_LOCK_KEY})
+        try:
+            assert worker.decay_inactive_ratings() == {"status": "already-running"}
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": worker._DECAY_LOCK_KEY})
+    assert _sigmas(engine)["dk1"][0] == 2.0
@@ -0,0 +1,59 @@
+import pytest
+
+from matcher import worker
+from .conftest import run_sql
+
+
+@pytest.fixture
+def oce(engine, monkeypatch):
+    monkeypatch.setattr(worker, "REGIONS", ["OCE"])
+    monkeypatch.setattr(worker, "MATCH_WINDOW", 4)
+    monkeypatch.setattr(worker, "MATCH_SCAN_LIMIT", 32)
+    monkeypatch.setattr(worker, "OVERFLOW_WAIT_S", 0)
+
+    def cleanup():
+        run_sql(engine, """DELETE FROM matches WHERE players::text LIKE '%"mtk%'""")
+        run_sql(engine, "DELETE FROM queue WHERE player_id LIKE 'mtk%'")
+        run_sql(engine, "DELETE FROM players WHERE player_id LIKE 'mtk%'")
+
+    def enqueue(pid, age_s, party=None, size=1):
+        params = {"pid": pid, "age": age_s, "party": party, "size": size}
+        run_sql(engine, """
+            INSERT INTO players (player_id, username, region, mu, sigma, last_active)
+            VALUES (:pid, :pid, 'OCE', 25, 8.333, NOW())
+        """, params)
+        run_sql(engine, """
+            INSERT INTO queue (player_id, enqueued_at, region, mu, sigma, party_id, party_size)
+            VALUES (:pid, NOW() - make_interval(secs => :age), 'OCE', 25, 8.333, :party, :size)
+        """, params)
+
+    cleanup()
+    yield enqueue
+    cleanup()
+
+
+def _queued(engine):
+    return {r.player_id for r in run_sql(engine, "SELECT player_id FROM queue WHERE player_id LIKE 'mtk%'")}
+
+
+@pytest.mark.integration
+def test_unmatchable_window_does_not_stall_the_region(engine, oce):
+    # more than a window of half parties whose partners never enqueue, oldest first
+    for i in range(6):
+        oce(f"mtk_half{i}", 600 - i, party=f"mtk_p{i}", size=2)
+    for i in range(4):
+        oce(f"mtk_solo{i}", 60 - i)
+
+    assert worker.match_tick()["matches_created"] == 1
+    assert _queued(engine) == {f"mtk_half{i}" for i in range(6)}
+
+
+@pytest.mark.integration
+def test_party_split_by_the_window_is_matched_together(engine, oce):
+    oce("mtk_a", 50, party="mtk_duo", size=2)
+    for i in range(4):
+        oce(f"mtk_solo{i}", 40 - i)
+    oce("mtk_b", 10, party="mtk_duo", size=2)
+
+    assert worker.match_tick()["matches_created"] == 1
+    assert "mtk_a" not in _queued(engine) and "mtk_b" not in _queued(engine)
@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+from matcher import worker
+from .conftest import run_sql
+
+
+@pytest.fixture
+def matches(engine, monkeypatch):
+    monkeypatch.setattr(worker, "REAPER_REPORTING_TIMEOUT_S", 60)
+    monkeypatch.setattr(worker, "REAPER_PENDING_TIMEOUT_S", 3600)
+    monkeypatch.setattr(worker, "REAPER_BATCH_SIZE", 2)
+
+    def cleanup():
+        run_sql(engine, "DELETE FROM results WHERE match_id LIKE 'rp_%'")
+        run_sql(engine, "DELETE FROM matches WHERE match_id LIKE 'rp_%'")
+        run_sql(engine, "DELETE FROM players WHERE player_id LIKE 'rp_%'")
+
+    cleanup()
+    run_sql(engine, """
+        INSERT INTO players (player_id, username, region, mu, sigma, last_active)
+        SELECT 'rp_' || g, 'rp_user' || g, 'EUW', 25, 8.333, NOW() FROM generate_series(1, 4) g
+    """)
+    teams = json.dumps({
+        "teamA": [{"player_id": "rp_1"}, {"player_id": "rp_2"}],
+        "teamB": [{"player_id": "rp_3"}, {"player_id": "rp_4"}],
+    })
+
+    def add(mid, status, age_s, reported_age_s=None):
+        run_sql(engine, """
+            INSERT INTO matches (match_id, players, created_at, region, quality, status)
+            VALUES (:mid, CAST(:teams AS JSON), NOW() - make_interval(secs => :age), 'EUW', 0.5, :status)
+        """, {"mid": mid, "teams": teams, "age": age_s, "status": status})
+        if reported_age_s is not None:
+            run_sql(engine, """
+                INSERT INTO results (match_id, winner_team, reported_at)
+                VALUES (:mid, 'teamA', NOW() - make_interval(secs => :age))
+            """, {"mid": mid, "age": reported_age_s})
+
+    yield add
+    cleanup()
+
+
+def _status(engine):
+    rows = run_sql(engine, "SELECT match_id, status FROM matches WHERE match_id LIKE 'rp_%'")
+    return {r.match_id: r.status for r in rows}
+
+
+def _mu(engine, pid):
+    return run_sql(engine, "SELECT mu FROM players WHERE player_id = :pid", {"pid": pid}).scalar_one()
+
+
+@pytest.mark.integration
+def test_reaper_reapplies_stuck_results_and_expires_abandoned_matches(engine, matches):
+    matches("rp_stuck", "reporting", 7200, reported_age_s=600)
+    matches("rp_fresh_report", "reporting", 7200, reported_age_s=5)
+    for i in range(3):  # more than one expiry batch
+        matches(f"rp_abandoned{i}", "pending", 7200 + i)
+    matches("rp_recent", "pending", 60)
+
+    out = worker.reap_stuck_matches()
+
+    assert out["status"] == "ok" and out["reapplied"] >= 1 and out["expired"] >= 3
+    assert _status(engine) == {
+        "rp_stuck": "finished",
+        "rp_fresh_report": "reporting",
+        "rp_abandoned0": "expired", "rp_abandoned1": "expired", "rp_abandoned2": "expired",
+        "rp_recent": "pending",
+    }
+    assert _mu(engine, "rp_1") > 25 > _mu(engine, "rp_3")
+
+
+@pytest.mark.integration
+def test_late_result_for_expired_match_moves_no_ratings(engine, matches):
+    matches("rp_late", "expired", 7200, reported_age_s=600)
+
+    out = worker.apply_result("rp_late", "teamA")
+
+    assert out["status"] == "expired"
+    assert _status(engine) == {"rp_late": "expired"}
+    assert _mu(engine, "rp_1") == 25
+
+
+@pytest.mark.integration
+def test_reaper_run_is_capped_and_the_next_run_carries_on(engine, matches, monkeypatch):
+    monkeypatch.setattr(worker, "REAPER_MAX_BATCHES", 1)
+    for i in range(3):
+        matches(f"rp_abandoned{i}", "pending", 7200 + i)
+
+    assert worker.reap_stuck_matches()["expired"] == 2  # one batch of REAPER_BATCH_SIZE
+    worker.reap_stuck_matches()
+
+    assert set(_status(engine).values()) == {"expired"}
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from matcher.lobbies import best_split, build_lobbies, matchable
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+MID, SUPPORT, TOP = 1 << 2, 1 << 4, 1 << 0
+
+
+def _row(pid, age, mu=25.0, party=None, size=1, roles=0, lo=None, hi=None):
+    return {
+        "player_id": pid, "mu": mu, "sigma": 8.333, "region": "EUW",
+        "enqueued_at": T0 + timedelta(seconds=age),
+        "party_id": party, "party_size": size, "role_mask": roles, "rating_min": lo, "rating_max": hi,
+    }
+
+
+def _ids(lobby):
+    teamA, teamB, _ = lobby
+    return {r["player_id"] for r in teamA}, {r["player_id"] for r in teamB}
+
+
+@pytest.mark.unit
+def test_four_solos_form_one_lobby():
+    lobbies = build_lobbies([_row(f"s{i}", i) for i in range(5)])
+    assert len(lobbies) == 1
+    teamA, teamB = _ids(lobbies[0])
+    assert teamA | teamB == {"s0", "s1", "s2", "s3"}
+
+
+@pytest.mark.unit
+def test_party_members_share_a_team():
+    rows = [_row("s0", 0), _row("p1", 1, party="p", size=2), _row("s2", 2), _row("p2", 3, party="p", size=2)]
+    teamA, teamB = _ids(build_lobbies(rows)[0])
+    assert {"p1", "p2"} in (teamA, teamB)
+
+
+@pytest.mark.unit
+def test_incomplete_party_is_left_out():
+    rows = [_row("p1", 0, party="p", size=2)] + [_row(f"s{i}", i) for i in range(1, 5)]
+    assert matchable(rows)[0]["player_id"] == "s1"
+    teamA, teamB = _ids(build_lobbies(rows)[0])
+    assert "p1" not in teamA | teamB
+
+
+@pytest.mark.unit
+def test_teams_need_two_distinct_roles():
+    rows = [_row("a", 0, roles=MID), _row("b", 1, roles=MID), _row("c", 2, roles=SUPPORT), _row("d", 3, roles=TOP)]
+    teamA, teamB = _ids(build_lobbies(rows)[0])
+    assert not {"a", "b"} <= teamA and not {"a", "b"} <= teamB
+    assert best_split([_row(p, 0, roles=MID) for p in "abcd"]) is None
+
+
+@pytest.mark.unit
+def test_single_role_party_is_never_placed():
+    rows = [_row("p1", 0, party="p", size=2, roles=MID), _row("p2", 1, party="p", size=2, roles=MID)]
+    rows += [_row(f"s{i}", i) for i in range(2, 6)]
+    assert [r["player_id"] for r in matchable(rows)] == ["s2", "s3", "s4", "s5"]
+    teamA, teamB = _ids(build_lobbies(rows)[0])
+    assert teamA | teamB == {"s2", "s3", "s4", "s5"}
+
+
+@pytest.mark.unit
+def test_rating_ranges_bound_every_member():
+    rows = [
+        _row("a", 0, mu=25, lo=20, hi=30),
+        _row("high", 1, mu=40),
+        _row("b", 2, mu=22), _row("c", 3, mu=28), _row("d", 4, mu=29),
+    ]
+    teamA, teamB = _ids(build_lobbies(rows)[0])
+    assert teamA | teamB == {"a", "b", "c", "d"}
+    # a's range doesn't cover high, and high's range doesn't cover the others
+    rows = [_row("a", 0, mu=25), _row("high", 1, mu=40, lo=35), _row("b", 2, mu=22), _row("c", 3, mu=28)]
+    assert build_lobbies(rows) == []
+
+
+@pytest.mark.unit
+def test_self_excluding_range_is_never_placed():
+    rows = [_row("x", 0, mu=25, lo=30)] + [_row(f"s{i}", i) for i in range(1, 5)]
+    assert "x" not in {r["player_id"] for r in matchable(rows)}
+
+
+@pytest.mark.unit
+def test_unmatchable_head_does_not_starve_the_rest():
+    # the oldest rows anchor nothing: a narrow range nobody fits and two half parties
+    rows = [_row("narrow", 0, mu=25, lo=24.9, hi=25.1)]
+    rows += [_row(f"half{i}", i, party=f"h{i}", size=2) for i in range(1, 3)]
+    rows += [_row(f"s{i}", 10 + i, mu=30 + i) for i in range(8)]
+    lobbies = build_lobbies(rows)
+    assert len(lobbies) == 2
+    placed = set().union(*(a | b for a, b in map(_ids, lobbies)))
+    assert placed == {f"s{i}" for i in range(8)}
@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+import pytest
+
+from matcher import worker
+from .test_lobbies import T0, _row
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    monkeypatch.setattr(worker, "OVERFLOW_WAIT_S", 60)
+    monkeypatch.setattr(worker, "_overflow_retry_at", {})
+    now = [T0 + timedelta(seconds=120)]
+    monkeypatch.setattr(worker, "_utcnow", lambda: now[0])
+    return now
+
+
+@pytest.mark.unit
+def test_overflow_waits_for_the_oldest_matchable_player(clock):
+    assert worker._overflow_due("OCE", [_row("s", 0)])
+    assert not worker._overflow_due("OCE", [_row("s", 90)])
+    # a party still missing its partner never makes the region borrow
+    assert not worker._overflow_due("OCE", [_row("p1", 0, party="p", size=2)])
+    assert not worker._overflow_due("OCE", [_row("p1", 0, party="p", size=2), _row("s", 90)])
+
+
+@pytest.mark.unit
+def test_fruitless_overflow_backs_off(clock, monkeypatch):
+    monkeypatch.setattr(worker, "OVERFLOW_RETRY_S", 10)
+    worker._overflow_retry_at["OCE"] = clock[0] + timedelta(seconds=10)
+    assert not worker._overflow_due("OCE", [_row("s", 0)])
+    assert worker._overflow_due("EUW", [_row("s", 0)])
+    clock[0] += timedelta(seconds=10)
+    assert worker._overflow_due("OCE", [_row("s", 0)])
@@ -0,0 +1,79 @@
+import json
+import threading
+
+import pytest
+from prometheus_client import REGISTRY
+
+from matcher import shadow
+from .test_lobbies import _row
+
+
+def _windows(outcome):
+    return REGISTRY.get_sample_value("shadow_windows_total", {"outcome": outcome}) or 0.0
+
+
+def _drain(runner):
+    runner._pool.shutdown(wait=True)
+    runner._pid = None  # the next submit starts a fresh pool
+
+
+@pytest.fixture
+def window():
+    return [_row(f"s{i}", i) for i in range(4)]
+
+
+@pytest.mark.unit
+def test_windows_beyond_max_pending_are_dropped_not_queued(monkeypatch, window):
+    release = threading.Event()
+
+    def slow(rows):
+        release.wait(5)
+        return []
+
+    monkeypatch.setitem(shadow.MATCHERS, "slow", slow)
+    runner = shadow.ShadowRunner(["slow"], max_pending=1)
+    submitted, dropped = _windows("submitted"), _windows("dropped")
+
+    for _ in range(3):
+        runner.submit("EUW", window, [], 0.0)
+    assert (_windows("submitted") - submitted, _windows("dropped") - dropped) == (1, 2)
+
+    release.set()
+    _drain(runner)
+    assert runner._pending == 0
+    runner.submit("EUW", window, [], 0.0)
+    assert _windows("submitted") - submitted == 2
+    _drain(runner)
+
+
+@pytest.mark.unit
+def test_broken_matcher_is_isolated(monkeypatch, tmp_path, window):
+    def boom(rows):
+        raise RuntimeError("candidate bug")
+
+    monkeypatch.setitem(shadow.MATCHERS, "boom", boom)
+    log_path = tmp_path / "shadow.jsonl"
+    runner = shadow.ShadowRunner(["boom", "greedy"], log_path=str(log_path))
+    errors = _windows("error")
+
+    live = shadow.build_lobbies(window)
+    runner.submit("EUW", window, live, 0.001)  # must not raise in the caller
+    _drain(runner)
+
+    assert _windows("error") - errors == 1
+    assert runner._pending == 0
+    lines = [json.loads(l) for l in log_path.read_text().splitlines()]
+    assert [(l["matcher"], l["matches"]) for l in lines] == [("live", 1), ("greedy", 1)]
+
+
+@pytest.mark.unit
+def test_neighbour_only_lobbies_are_not_counted(tmp_path, window):
+    log_path = tmp_path / "shadow.jsonl"
+    runner = shadow.ShadowRunner(["greedy"], log_path=str(log_path))
+    neighbours = [{**r, "region": "EUNE"} for r in window]
+
+    runner.submit("EUW", neighbours, [], 0.0)
+    _drain(runner)
+
+    lines = [json.loads(l) for l in log_path.read_text().splitlines()]
+    assert [(l["matcher"], l["matches"]) for l in lines] == [("live", 0), ("greedy", 0)]
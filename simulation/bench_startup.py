@@ -0,0 +1,63 @@
+"""
+Cold start benchmark for the API and the matcher worker.
+
+  python simulation/bench_startup.py            # import times only, no services needed
+  DB_DSN=... python simulation/bench_startup.py --serve
+
+--serve additionally spawns uvicorn and measures time until the first successful /healthz,
+which includes the startup hook (schema check). Each measurement uses a fresh interpreter.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(ROOT, "services", "api")
+SERVICES_DIR = os.path.join(ROOT, "services")
+RUNS = int(os.getenv("RUNS", "5"))
+PORT = int(os.getenv("BENCH_PORT", "8099"))
+
+
+def _import_time(module: str, cwd: str) -> float:
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, check=True,
+        env={**os.environ, "PYTHONPATH": cwd},
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _time_to_first_request(timeout_s: float = 60.0) -> float:
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(PORT), "--log-level", "warning"],
+        cwd=API_DIR, env={**os.environ, "PYTHONPATH": API_DIR},
+    )
+    try:
+        while time.perf_counter() - t0 < timeout_s:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{PORT}/healthz", timeout=0.5)
+                return time.perf_counter() - t0
+            except Exception:
+                if proc.poll() is not None:
+                    raise RuntimeError("api exited during startup")
+                time.sleep(0.01)
+        raise TimeoutError("api did not become ready")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def _report(name: str, samples: list[float]) -> None:
+    print(f"{name:24s} median {statistics.median(samples) * 1000:8.1f} ms  "
+          f"min {min(samples) * 1000:8.1f} ms  ({len(samples)} runs)")
+
+
+if __name__ == "__main__":
+    _report("api import", [_import_time("app.main", API_DIR) for _ in range(RUNS)])
+    _report("worker import", [_import_time("matcher.worker", SERVICES_DIR) for _ in range(RUNS)])
+    if "--serve" in sys.argv:
+        _report("api first request", [_time_to_first_request() for _ in range(RUNS)])
@@ -0,0 +1,181 @@
+"""
+Replay recorded queue traffic (see services/api/app/queue_trace.py).
+
+  # against a running API, at 1x
+  python simulation/replay_trace.py --target api trace.bin.*
+  # straight into the matcher functions, 20x faster (0 = as fast as possible)
+  DB_DSN=... python simulation/replay_trace.py --target matcher --speed 20 trace.bin.*
+
+api:      registers one player per traced player id (the id doubles as idempotency key, so
+          reruns reuse the same players), then enqueues/dequeues on schedule; each player's
+          requests are sent one after another, in trace order. Result events refer to matches
+          of the recorded run and are skipped. At --speed above 1 (or 0) start the API with
+          RATE_LIMIT_KEY_RPS=0 and RATE_LIMIT_PLAYER_RPS=0: the replay uses one API key, and
+          429s are reported as `limited`, not as the API's errors.
+matcher:  upserts players/queue rows directly and calls match_tick() every
+          TICK_S of trace time, so the grouping code sees the recorded arrival shape.
+          enqueued_at comes from the trace and the worker's clock is pinned to trace time,
+          so waits (OVERFLOW_WAIT_S) behave as recorded at any --speed.
+"""
+import argparse
+import asyncio
+import heapq
+import math
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "services", "api"))
+
+from app.queue_trace import EVENT_DEQUEUE, EVENT_ENQUEUE, read_trace  # noqa: E402
+
+API_URL = os.getenv("API_URL", "http://localhost:8080")
+API_KEY = os.getenv("API_KEY", "dev")
+CONCURRENCY = int(os.getenv("CONCURRENCY", "100"))
+TICK_S = 0.2
+
+
+def _events(paths):
+    # each API worker writes its own file; merge them by timestamp
+    return heapq.merge(*(read_trace(p) for p in paths), key=lambda e: e.ts)
+
+
+class _Clock:
+    """Maps trace time to wall time at `speed` (0 = no waiting)."""
+
+    def __init__(self, speed: float):
+        self.speed = speed
+        self.t0_trace = None
+        self.t0_wall = time.perf_counter()
+
+    def delay(self, ts: float) -> float:
+        if self.t0_trace is None:
+            self.t0_trace = ts
+        if self.speed <= 0:
+            return 0.0
+        due = self.t0_wall + (ts - self.t0_trace) / self.speed
+        return max(0.0, due - time.perf_counter())
+
+
+async def replay_api(paths, speed: float):
+    import httpx
+
+    clock = _Clock(speed)
+    players: dict[str, str] = {}
+    sem = asyncio.Semaphore(CONCURRENCY)
+    stats = {"sent": 0, "errors": 0, "limited": 0, "skipped": 0}
+    # traced player id -> that player's last request, which the next one waits for
+    tails: dict[str, asyncio.Task] = {}
+
+    async def player_for(client, traced_id, region):
+        pid = players.get(traced_id)
+        if pid is None:
+            r = await client.post(
+                f"{API_URL}/players/register",
+                headers={"X-Idempotency-Key": traced_id},
+                json={"username": f"replay_{traced_id}", "region": region or "EUW"},
+            )
+            r.raise_for_status()
+            pid = players[traced_id] = r.json()["player_id"]
+        return pid
+
+    async def send(client, ev, prev):
+        if prev is not None:
+            await prev
+        async with sem:
+            try:
+                pid = await player_for(client, ev.id, ev.region)
+                if ev.event == EVENT_ENQUEUE:
+                    r = await client.post(f"{API_URL}/matchmaking/queue",
+                                          headers={"x-api-key": API_KEY}, json={"player_id": pid})
+                else:
+                    r = await client.delete(f"{API_URL}/matchmaking/queue/{pid}",
+                                            headers={"x-api-key": API_KEY})
+                stats["sent"] += 1
+                if r.status_code == 429:
+                    stats["limited"] += 1
+                elif r.status_code >= 400:
+                    stats["errors"] += 1
+            except Exception:
+                stats["errors"] += 1
+
+    limits = httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY)
+    async with httpx.AsyncClient(limits=limits, timeout=5.0) as client:
+        pending = set()
+        for ev in _events(paths):
+            if ev.event not in (EVENT_ENQUEUE, EVENT_DEQUEUE):
+                stats["skipped"] += 1
+                continue
+            wait = clock.delay(ev.ts)
+            if wait:
+                await asyncio.sleep(wait)
+            task = tails[ev.id] = asyncio.create_task(send(client, ev, tails.get(ev.id)))
+            task.add_done_callback(lambda t, k=ev.id: tails.pop(k) if tails.get(k) is t else None)
+            pending.add(task)
+            pending = {t for t in pending if not t.done()}
+        await asyncio.gather(*pending)
+    print(f"api replay: {stats}")
+
+
+def replay_matcher(paths, speed: float):
+    os.environ.setdefault("REGIONS", "EUW,EUNE,NA,CHN,JPN,KR,OCE,BR,LAS,LAN")
+    sys.path.insert(0, os.path.join(ROOT, "services"))
+    from sqlalchemy import text
+    from matcher import worker
+
+    engine = worker._get_engine()
+    clock = _Clock(speed)
+    next_tick = None
+    ticks = made = 0
+    t_wall = time.perf_counter()
+
+    def tick(trace_ts):
+        nonlocal ticks, made
+        worker._utcnow = lambda: datetime.fromtimestamp(trace_ts, timezone.utc)
+        out = worker.match_tick()
+        ticks += 1
+        made += out.get("matches_created", 0)
+
+    for ev in _events(paths):
+        next_tick = ev.ts if next_tick is None else next_tick
+        while ev.ts >= next_tick:
+            tick(next_tick)
+            next_tick += TICK_S
+        wait = clock.delay(ev.ts)
+        if wait:
+            time.sleep(wait)
+        with engine.begin() as conn:
+            if ev.event == EVENT_ENQUEUE:
+                mu = 25.0 if math.isnan(ev.mu) else ev.mu
+                sigma = 8.333 if math.isnan(ev.sigma) else ev.sigma
+                conn.execute(text("""
+                    INSERT INTO players (player_id, username, region, mu, sigma, last_active)
+                    VALUES (:pid, :name, :r, :mu, :sigma, NOW())
+                    ON CONFLICT (player_id) DO NOTHING
+                """), {"pid": ev.id, "name": f"replay_{ev.id}", "r": ev.region, "mu": mu, "sigma": sigma})
+                conn.execute(text("""
+                    INSERT INTO queue (player_id, enqueued_at, region, mu, sigma)
+                    VALUES (:pid, :enqueued_at, :r, :mu, :sigma)
+                    ON CONFLICT (player_id) DO UPDATE SET enqueued_at = EXCLUDED.enqueued_at
+                """), {"pid": ev.id, "enqueued_at": datetime.fromtimestamp(ev.ts, timezone.utc),
+                       "r": ev.region, "mu": mu, "sigma": sigma})
+            elif ev.event == EVENT_DEQUEUE:
+                conn.execute(text("DELETE FROM queue WHERE player_id = :pid"), {"pid": ev.id})
+    if next_tick is not None:
+        tick(next_tick)
+    dt = time.perf_counter() - t_wall
+    print(f"matcher replay: ticks={ticks} matches_created={made} wall={dt:.1f}s")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("traces", nargs="+")
+    ap.add_argument("--target", choices=("api", "matcher"), default="api")
+    ap.add_argument("--speed", type=float, default=1.0, help="time acceleration, 0 = as fast as possible")
+    args = ap.parse_args()
+    if args.target == "api":
+        asyncio.run(replay_api(args.traces, args.speed))
+    else:
+        replay_matcher(args.traces, args.speed)